@@ -0,0 +1,137 @@
+import json
+import sys
+import time
+
+import search
+import snapshot
+from cache import PathCache
+from components import Components
+from parallel import pool_context
+
+# Answers many "degrees between X and Y" queries across a process pool.
+#
+# Input has one tab-separated "source name<TAB>target name" pair per line.
+# Output is one JSON object per pair, in input order:
+#   {"source", "target", "degrees", "path", "ms"} or {"source", "target", "error"}
+#
+# The graph is loaded once in the parent. With the fork start method the
+# workers inherit it copy-on-write; elsewhere each worker loads it itself,
+# which only maps the file when a snapshot exists.
+
+# Per-process state, set by load() in the parent or init_worker() in a worker
+_graph = None
+_names = None
+_engine = None
+_workspace = None
+_cache = None
+_components = None
+
+
+def load(directory, engine="bidirectional", cache_size=0):
+    global _graph, _names, _engine, _workspace, _cache, _components
+    graph = snapshot.load_or_build(directory)
+    _graph = graph
+    _names = graph.names_view()
+    _engine = search.ENGINES[engine]
+    _workspace = search.Workspace.for_graph(graph)
+    _components = Components(graph)
+    # Each worker caches its own answers; repeated pairs in one chunk
+    # (or landing on the same worker) skip the search
+    _cache = PathCache(cache_size, graph=graph) if cache_size > 0 else None
+
+
+def init_worker(directory, engine, cache_size):
+    if _graph is None:
+        load(directory, engine, cache_size)
+
+
+def find_path(source, target):
+    if not _components.connected(source, target):
+        return None
+    return _engine(_graph, source, target, _workspace)
+
+
+def resolve(name):
+    """
+    Returns (person index, None) or (None, error message).
+    Ambiguous names are an error listing the candidate ids;
+    batch mode never prompts.
+    """
+    person_ids = sorted(_names.get(name.lower(), ()))
+    if len(person_ids) == 0:
+        return None, f"person not found: {name}"
+    if len(person_ids) > 1:
+        return None, f"ambiguous name: {name} (ids {', '.join(person_ids)})"
+    return _graph.person_index(person_ids[0]), None
+
+
+def answer(line):
+    """
+    Answers one input line; returns its JSON output line.
+    """
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != 2:
+        return json.dumps({"line": line.rstrip("\n"), "error": "expected two tab-separated names"})
+    source_name, target_name = fields
+    result = {"source": source_name, "target": target_name}
+
+    source, error = resolve(source_name)
+    if error is None:
+        target, error = resolve(target_name)
+    if error is not None:
+        result["error"] = error
+        return json.dumps(result)
+
+    start = time.perf_counter()
+    if _cache is not None:
+        path = _cache.lookup(source, target, find_path)
+    else:
+        path = find_path(source, target)
+    result["ms"] = round((time.perf_counter() - start) * 1000, 3)
+    path = search.path_to_ids(_graph, path)
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return json.dumps(result)
+
+
+def run(directory, lines, out, workers=None, engine="bidirectional", chunksize=64, cache_size=0):
+    """
+    Answers every line of `lines`, writing JSON lines to `out` as they complete.
+    With `cache_size`, each worker keeps an LRU cache of that many pairs.
+    """
+    load(directory, engine, cache_size)
+    context = pool_context()
+    with context.Pool(workers, initializer=init_worker, initargs=(directory, engine, cache_size)) as pool:
+        for output in pool.imap(answer, (line for line in lines if line.strip()), chunksize):
+            out.write(output + "\n")
+
+
+def main():
+    args = sys.argv[1:]
+    workers = None
+    engine = "bidirectional"
+    cache_size = 0
+    for arg in list(args):
+        if arg.startswith("--workers=") and arg[len("--workers="):].isdigit():
+            workers = int(arg[len("--workers="):])
+            args.remove(arg)
+        elif arg.startswith("--engine="):
+            engine = arg[len("--engine="):]
+            args.remove(arg)
+        elif arg.startswith("--cache=") and arg[len("--cache="):].isdigit():
+            cache_size = int(arg[len("--cache="):])
+            args.remove(arg)
+    if not 1 <= len(args) <= 2 or engine not in search.ENGINES:
+        sys.exit("Usage: python batch.py [--workers=N] [--engine=NAME] [--cache=N] directory [pairs.tsv]\n"
+                 f"Engines: {', '.join(search.ENGINES)}")
+    directory = args[0]
+
+    if len(args) == 2:
+        with open(args[1], encoding="utf-8") as f:
+            run(directory, f, sys.stdout, workers, engine, cache_size=cache_size)
+    else:
+        run(directory, sys.stdin, sys.stdout, workers, engine, cache_size=cache_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import search
+import snapshot
+import synthetic
+from instrument import Probe
+from landmarks import LandmarkOracle
+from parallel import ParallelSearch
+
+# Reproducible benchmark of every degrees search strategy.
+#
+#   python benchmark.py [--queries=N] [--seed=N] [--strategies=a,b,...]
+#                       [--pairs=pairs.tsv] [--no-memory] [--output=results.json]
+#                       [--synthetic [--people=N] [--movies=N] [--cast=N] [--skew=S]]
+#                       directory
+#
+# With --synthetic, synthetic.py first generates the data set into
+# `directory`. Queries are random pairs of person ids drawn with a fixed
+# seed, or id pairs read from --pairs (one "source<TAB>target" per line).
+#
+# Each strategy answers every query twice: once timed, and once with
+# expansion counting and tracemalloc on, since both slow the search down.
+# "explored" counts people whose co-stars were fetched; "peak_kib" is the
+# most memory a query allocated beyond what was in use when it started.
+# Path lengths are checked against a plain BFS over the compact graph;
+# queries that raise count as errors and are left out of the statistics.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SELF_STUDIES = os.path.join(HERE, "..", "self_studies")
+
+# Engines over the shared CompactGraph (see search.ENGINES)
+COMPACT = ("bfs", "bidirectional", "batched", "direction", "landmarks", "parallel")
+
+# Self-contained scripts over their own dicts: name -> file
+SCRIPTS = {
+    "degrees": os.path.join(HERE, "degrees.py"),
+    "stable_noprints": os.path.join(SELF_STUDIES, "degrees_stable_noprints.py"),
+    "stable_withprints": os.path.join(SELF_STUDIES, "degrees_stable_withprints.py"),
+    "beta": os.path.join(SELF_STUDIES, "degrees_beta_bidirectionalBFS.py"),
+    "betav2": os.path.join(SELF_STUDIES, "degrees_betav2_bidirectionalBFS.py"),
+    "betav3": os.path.join(SELF_STUDIES, "degrees_betav3_Bi-BFS.py"),
+    "gamma": os.path.join(SELF_STUDIES, "degrees_gamma_bidirectional_and_heuristic.py"),
+}
+
+STRATEGIES = COMPACT + tuple(SCRIPTS)
+
+
+class CompactRunner():
+    """
+    Runs one engine, the landmark oracle or the parallel BFS
+    on a loaded CompactGraph.
+    """
+
+    def __init__(self, graph, name):
+        self.graph = graph
+        self.expanded = 0
+        self.probe = None
+        self.parallel = None
+        workspace = search.Workspace.for_graph(graph)
+        if name == "landmarks":
+            oracle = LandmarkOracle(graph)
+            self.search = lambda s, t: oracle.shortest_path(s, t, workspace, self.probe)
+        elif name == "parallel":
+            self.parallel = ParallelSearch(graph)
+            self.search = lambda s, t: self.parallel.shortest_path(s, t, workspace, self.probe)
+        else:
+            engine = search.ENGINES[name]
+            self.search = lambda s, t: engine(graph, s, t, workspace, self.probe)
+
+    def find(self, source, target):
+        graph = self.graph
+        path = self.search(graph.person_index(source), graph.person_index(target))
+        return search.path_to_ids(graph, path)
+
+    @contextlib.contextmanager
+    def counting(self):
+        self.probe = _ExpansionCounter(self)
+        try:
+            yield
+        finally:
+            self.probe = None
+
+    def close(self):
+        if self.parallel is not None:
+            self.parallel.close()
+
+
+class ScriptRunner():
+    """
+    Imports one of the standalone degrees scripts as a private module
+    and calls its load_data and shortest_path. Their output is discarded.
+    """
+
+    def __init__(self, name, directory):
+        if SELF_STUDIES not in sys.path:
+            sys.path.append(SELF_STUDIES)
+        spec = importlib.util.spec_from_file_location(f"benchmark_{name}", SCRIPTS[name])
+        self.module = importlib.util.module_from_spec(spec)
+        self.expanded = 0
+        with _quiet():
+            spec.loader.exec_module(self.module)
+            self.module.load_data(directory)
+
+    def find(self, source, target):
+        with _quiet():
+            return self.module.shortest_path(source, target)
+
+    @contextlib.contextmanager
+    def counting(self):
+        if hasattr(self.module, "probe"):
+            # degrees.py reports expansions through its probe
+            self.module.probe = _ExpansionCounter(self)
+            try:
+                yield
+            finally:
+                self.module.probe = None
+            return
+        neighbors_for_person = self.module.neighbors_for_person
+
+        def counted(person_id):
+            self.expanded += 1
+            return neighbors_for_person(person_id)
+
+        self.module.neighbors_for_person = counted
+        try:
+            yield
+        finally:
+            self.module.neighbors_for_person = neighbors_for_person
+
+    def close(self):
+        pass
+
+
+class _ExpansionCounter(Probe):
+    """
+    Adds the people each level expanded to runner.expanded,
+    or takes the running count from progress() calls.
+    """
+
+    interval = 1
+
+    def __init__(self, runner):
+        super().__init__()
+        self.runner = runner
+
+    def level(self, side, depth, expanded, discovered, scanned=0):
+        self.runner.expanded += len(expanded)
+
+    def progress(self, expanded, frontier):
+        self.runner.expanded = expanded
+
+
+def query_set(graph, count, seed=0):
+    """
+    Returns `count` (source id, target id) pairs of distinct people,
+    the same ones for the same graph and seed.
+    """
+    rng = random.Random(seed)
+    people = [graph.person_ids[i] for i in range(graph.num_people)
+              if i not in graph.removed_people]
+    pairs = []
+    while len(pairs) < count and len(people) > 1:
+        source, target = rng.sample(people, 2)
+        pairs.append((source, target))
+    return pairs
+
+
+def read_pairs(path):
+    with open(path, encoding="utf-8") as f:
+        return [tuple(line.rstrip("\n").split("\t")) for line in f if line.strip()]
+
+
+def reference_lengths(graph, pairs):
+    """
+    Degrees of separation for each pair (None if not connected).
+    """
+    workspace = search.Workspace.for_graph(graph)
+    lengths = []
+    for source, target in pairs:
+        path = search.shortest_path(
+            graph, graph.person_index(source), graph.person_index(target), workspace
+        )
+        lengths.append(None if path is None else len(path))
+    return lengths
+
+
+def measure(runner, pairs, expected, memory=True):
+    """
+    Answers every pair with `runner`; returns its summary dict.
+    """
+    latencies = []
+    wrong = 0
+    failed = set()
+    for i, ((source, target), length) in enumerate(zip(pairs, expected)):
+        start = time.perf_counter()
+        try:
+            path = runner.find(source, target)
+        except Exception:
+            # Some of the older scripts crash on certain pairs
+            failed.add(i)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        if (None if path is None else len(path)) != length:
+            wrong += 1
+
+    explored = []
+    peaks = []
+    if memory:
+        tracemalloc.start()
+    try:
+        with runner.counting():
+            for i, (source, target) in enumerate(pairs):
+                if i in failed:
+                    continue
+                runner.expanded = 0
+                if memory:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                runner.find(source, target)
+                explored.append(runner.expanded)
+                if memory:
+                    peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    finally:
+        if memory:
+            tracemalloc.stop()
+
+    summary = {
+        "latency_ms": summarize(latencies, 3),
+        "explored": summarize(explored, 1),
+        "wrong_length": wrong,
+        "errors": len(failed),
+    }
+    if memory:
+        summary["peak_kib"] = summarize(peaks, 1)
+    return summary
+
+
+def summarize(values, digits):
+    """
+    Mean, min, max and nearest-rank percentiles of `values`.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def percentile(p):
+        return ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+
+    return {
+        "mean": round(sum(ordered) / len(ordered), digits),
+        "min": round(ordered[0], digits),
+        "p50": round(percentile(50), digits),
+        "p90": round(percentile(90), digits),
+        "p99": round(percentile(99), digits),
+        "max": round(ordered[-1], digits),
+    }
+
+
+def run(directory, strategies=STRATEGIES, queries=200, seed=0, pairs=None, memory=True):
+    """
+    Benchmarks `strategies` on the data in `directory`; returns the results dict.
+    """
+    start = time.perf_counter()
+    graph = snapshot.load_or_build(directory)
+    graph_load = time.perf_counter() - start
+    if pairs is None:
+        pairs = query_set(graph, queries, seed)
+    expected = reference_lengths(graph, pairs)
+
+    results = {
+        "directory": directory,
+        "people": graph.num_people,
+        "movies": graph.num_movies,
+        "stars": graph.num_stars,
+        "queries": len(pairs),
+        "seed": seed,
+        "not_connected": expected.count(None),
+        "strategies": {},
+    }
+    for name in strategies:
+        start = time.perf_counter()
+        if name in COMPACT:
+            runner = CompactRunner(graph, name)
+            setup = graph_load + time.perf_counter() - start
+        else:
+            runner = ScriptRunner(name, directory)
+            setup = time.perf_counter() - start
+        summary = {"setup_s": round(setup, 3)}
+        try:
+            summary.update(measure(runner, pairs, expected, memory))
+        finally:
+            runner.close()
+        results["strategies"][name] = summary
+    return results
+
+
+@contextlib.contextmanager
+def _quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def main():
+    args = sys.argv[1:]
+    queries = 200
+    seed = 0
+    strategies = STRATEGIES
+    pairs = None
+    memory = True
+    output = None
+    generate = False
+    options = {"people": 10000, "movies": 5000, "cast": 4, "skew": 2.0}
+    for arg in list(args):
+        name, _, value = arg[2:].partition("=")
+        if arg.startswith("--queries=") and value.isdigit():
+            queries = int(value)
+        elif arg.startswith("--seed=") and value.isdigit():
+            seed = int(value)
+        elif arg.startswith("--strategies="):
+            strategies = tuple(value.split(","))
+        elif arg.startswith("--pairs="):
+            pairs = value
+        elif arg.startswith("--output="):
+            output = value
+        elif arg == "--no-memory":
+            memory = False
+        elif arg == "--synthetic":
+            generate = True
+        elif arg.startswith("--") and name in options:
+            options[name] = type(options[name])(value)
+        else:
+            continue
+        args.remove(arg)
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if len(args) != 1 or unknown:
+        sys.exit("Usage: python benchmark.py [--queries=N] [--seed=N] [--strategies=a,b]\n"
+                 "       [--pairs=pairs.tsv] [--no-memory] [--output=results.json]\n"
+                 "       [--synthetic [--people=N] [--movies=N] [--cast=N] [--skew=S]] directory\n"
+                 f"Strategies: {', '.join(STRATEGIES)}")
+    directory = args[0]
+
+    if generate:
+        synthetic.generate(directory, seed=seed, **options)
+    results = run(directory, strategies, queries, seed,
+                  read_pairs(pairs) if pairs is not None else None, memory)
+    if generate:
+        results["synthetic"] = options
+
+    text = json.dumps(results, indent=2)
+    if output is None:
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+
+# Result cache for repeated shortest-path queries.
+#
+# Degrees of separation are symmetric, so (a, b) and (b, a) share one entry,
+# stored in the direction it was first computed and reversed on the way out
+# when asked the other way round. "Not connected" (None) is cached too.
+
+
+# Returned by PathCache.get when nothing usable is cached
+MISS = object()
+
+
+class PathCache():
+    """
+    LRU cache of paths keyed by the unordered (source, target) pair,
+    with an optional time-to-live per entry.
+
+    Given a graph, every entry is dropped as soon as graph.version
+    moves, so answers never outlive an update.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, graph=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.graph = graph
+        self.clock = clock
+        # key -> (source, path from source, expiry time or None)
+        self.entries = OrderedDict()
+        self.version = None if graph is None else graph.version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, source, target):
+        """
+        Returns the cached path from `source` to `target`, or MISS.
+        """
+        self._check_version()
+        key = _key(source, target)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS
+        stored_source, path, expiry = entry
+        if expiry is not None and self.clock() >= expiry:
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISS
+        self.entries.move_to_end(key)
+        self.hits += 1
+        if stored_source == source or path is None:
+            return path
+        return reverse_path(stored_source, path)
+
+    def put(self, source, target, path):
+        """
+        Stores a path (list of (movie, person) pairs, or None).
+        """
+        if self.maxsize <= 0:
+            return
+        self._check_version()
+        key = _key(source, target)
+        expiry = None if self.ttl is None else self.clock() + self.ttl
+        self.entries[key] = (source, path, expiry)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, source, target, search):
+        """
+        Returns the cached path, or calls search(source, target),
+        caches its result and returns that.
+        """
+        path = self.get(source, target)
+        if path is MISS:
+            path = search(source, target)
+            self.put(source, target, path)
+        return path
+
+    def invalidate(self):
+        self.entries.clear()
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _check_version(self):
+        if self.graph is not None and self.graph.version != self.version:
+            self.entries.clear()
+            self.version = self.graph.version
+
+
+def reverse_path(source, path):
+    """
+    Turns a path of (movie, person) pairs from `source` into the
+    same path walked from its last person back to `source`.
+    """
+    people = [source] + [person for _, person in path]
+    return [(path[i][0], people[i]) for i in range(len(path) - 1, -1, -1)]
+
+
+def _key(source, target):
+    return (source, target) if source <= target else (target, source)
@@ -0,0 +1,124 @@
+from array import array
+
+from graph import INDEX_TYPE
+
+# Connected components of the co-star graph.
+#
+# Everyone in a movie is in the same component, so a union-find pass
+# that joins each movie's stars labels every person in one sweep over
+# the CSR arrays. Two people with different labels are not connected,
+# which a search could only prove by exhausting a whole component.
+
+
+class Components():
+    """
+    Component labels and sizes for a CompactGraph's people.
+    Labels are dense, numbered in order of each component's lowest
+    person index. Rebuilt automatically after the graph changes.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.labels = None
+        self.sizes = None
+        self._build()
+
+    def _build(self):
+        graph = self.graph
+        if graph.component_labels is None:
+            graph.component_labels = label_components(graph)
+        self.labels = graph.component_labels
+        self.sizes = array(INDEX_TYPE, [0]) * (max(self.labels, default=-1) + 1)
+        for label in self.labels:
+            self.sizes[label] += 1
+
+    def _current(self):
+        # apply() drops graph.component_labels, so identity tells freshness
+        if self.graph.component_labels is not self.labels:
+            self._build()
+        return self.labels
+
+    def connected(self, source, target):
+        """
+        True if person indices `source` and `target` share a component.
+        """
+        labels = self._current()
+        return labels[source] == labels[target]
+
+    def label(self, person):
+        return self._current()[person]
+
+    def size(self, person):
+        """
+        Number of people in `person`'s component, including them.
+        """
+        labels = self._current()
+        return self.sizes[labels[person]]
+
+    @property
+    def count(self):
+        self._current()
+        return len(self.sizes)
+
+    def largest(self, n=10):
+        """
+        Returns (label, size) for the `n` biggest components.
+        """
+        self._current()
+        return sorted(enumerate(self.sizes), key=lambda item: -item[1])[:n]
+
+    def summary(self):
+        """
+        Component count, largest component size and number of people
+        who share no movie with anyone (removed people excluded).
+        """
+        labels = self._current()
+        removed = self.graph.removed_people
+        singletons = sum(
+            1 for person, label in enumerate(labels)
+            if self.sizes[label] == 1 and person not in removed
+        )
+        return {
+            "people": len(labels) - len(removed),
+            "components": len(self.sizes) - len(removed),
+            "largest": max(self.sizes, default=0),
+            "singletons": singletons,
+        }
+
+
+def label_components(graph):
+    """
+    Returns an array of dense component labels, one per person index.
+    """
+    parent = array(INDEX_TYPE, range(graph.num_people))
+
+    def find(person):
+        # Path halving keeps the trees shallow without recursion
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(graph.num_movies):
+        stars = graph.stars_of(movie)
+        if len(stars) < 2:
+            continue
+        root = find(stars[0])
+        for star in stars[1:]:
+            other = find(star)
+            if other != root:
+                # Keep the lower index as root so labels are stable
+                if other < root:
+                    root, other = other, root
+                parent[other] = root
+
+    labels = array(INDEX_TYPE, [0]) * graph.num_people
+    roots = {}
+    for person in range(graph.num_people):
+        root = find(person)
+        label = roots.get(root)
+        if label is None:
+            label = roots[root] = len(roots)
+        labels[person] = label
+    return labels
+
@@ -0,0 +1,235 @@
+from array import array
+from itertools import accumulate
+
+from graph import CompactGraph, INDEX_TYPE, OFFSET_TYPE, _group
+
+# Compressed adjacency for graphs too large for plain CSR arrays.
+#
+# Every neighbor list is sorted, so it is stored as gaps: the first index,
+# then the difference to the previous one, each as a little-endian base
+# 128 varint (7 bits per byte, high bit set on all bytes but the last).
+# Lists are concatenated into one byte string. Random access goes through
+# a block index: the byte offset of every 2**shift-th list, plus a 16-bit
+# offset of each list relative to its block's start, so locating a list
+# costs two array reads instead of an 8-byte offset per list.
+#
+# Lists are decoded on every movies_of/stars_of call; nothing decoded is
+# kept. Lists whose gaps all fit in one byte decode in C.
+#
+# Building from edges encodes each half as soon as it is grouped, so at
+# most one half's plain CSR arrays exist at a time; the full savings
+# are seen when the compressed sections are mapped from a snapshot.
+
+# Largest block of lists; smaller ones are used where a block's bytes
+# would not fit 16-bit relative offsets
+BLOCK_SHIFT = 6
+
+
+class CompressedLists():
+    """
+    Sequence of sorted index lists, delta and varint encoded.
+    `blocks` and `relative` are arrays or casted memoryviews and `data`
+    a bytes-like object, so they can be mapped from a snapshot.
+    """
+
+    def __init__(self, blocks, relative, data, shift, count):
+        self.blocks = blocks
+        self.relative = relative
+        self.data = data
+        self.shift = shift
+        # Total entries over all lists
+        self.count = count
+
+    @classmethod
+    def encode(cls, rows, shift=BLOCK_SHIFT):
+        """
+        Encodes an iterable of sorted index lists.
+        """
+        data = bytearray()
+        # Encoded length of each list, until the block index is built
+        lengths = array("I")
+        count = 0
+        for row in rows:
+            start = len(data)
+            previous = 0
+            for value in row:
+                gap = value - previous
+                previous = value
+                while gap >= 0x80:
+                    data.append(gap & 0x7F | 0x80)
+                    gap >>= 7
+                data.append(gap)
+            count += len(row)
+            lengths.append(len(data) - start)
+
+        index = _index(lengths, shift)
+        while index is None:
+            shift -= 1
+            index = _index(lengths, shift)
+        blocks, relative = index
+        return cls(blocks, relative, data, shift, count)
+
+    def __len__(self):
+        return len(self.relative) - 1
+
+    def __getitem__(self, i):
+        shift, blocks, relative = self.shift, self.blocks, self.relative
+        chunk = bytes(self.data[blocks[i >> shift] + relative[i]:blocks[(i + 1) >> shift] + relative[i + 1]])
+        if chunk.isascii():
+            # Every gap is a single byte
+            return list(accumulate(chunk))
+        values = []
+        value = 0
+        gap = 0
+        bits = 0
+        for byte in chunk:
+            gap |= (byte & 0x7F) << bits
+            if byte & 0x80:
+                bits += 7
+            else:
+                value += gap
+                values.append(value)
+                gap = 0
+                bits = 0
+        return values
+
+    def decode(self):
+        """
+        Returns all lists as CSR (offsets, values) arrays.
+        """
+        offsets = array(OFFSET_TYPE, [0])
+        values = array(INDEX_TYPE)
+        for i in range(len(self)):
+            values.extend(self[i])
+            offsets.append(len(values))
+        return offsets, values
+
+    def nbytes(self):
+        return (len(self.blocks) * self.blocks.itemsize + len(self.relative) * self.relative.itemsize
+                + len(self.data))
+
+
+class CompressedGraph(CompactGraph):
+    """
+    CompactGraph whose adjacency is held as CompressedLists
+    (person_lists and movie_lists) instead of CSR arrays, which are None.
+    Build with from_csv or from_graph, or read a compressed snapshot.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._compress(self.person_offsets, self.person_movies, self.movie_offsets, self.movie_stars)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Compresses a CompactGraph's adjacency; everything else is shared
+        with `graph`, which should not be updated afterwards.
+        """
+        graph.consolidate()
+        compressed = cls()
+        compressed.__dict__.update(
+            (name, value) for name, value in graph.__dict__.items()
+            if name not in ("person_offsets", "person_movies", "movie_offsets", "movie_stars")
+        )
+        compressed._compress(graph.person_offsets, graph.person_movies,
+                             graph.movie_offsets, graph.movie_stars)
+        return compressed
+
+    def set_edges(self, edge_people, edge_movies):
+        """
+        Like CompactGraph.set_edges, but each half is encoded straight
+        from its grouped edges and dropped before the other is grouped.
+        """
+        num_people, num_movies = len(self.person_ids), len(self.movie_ids)
+        offsets, movies = _group(edge_people, edge_movies, num_people)
+        self.person_lists = CompressedLists.encode(
+            sorted(set(movies[offsets[i]:offsets[i + 1]])) for i in range(num_people)
+        )
+        del offsets, movies
+
+        # Group the stars from the deduplicated person lists; walking
+        # people in order keeps every star list sorted
+        person_lists = self.person_lists
+        offsets = array(OFFSET_TYPE, [0]) * (num_movies + 1)
+        for person in range(num_people):
+            for movie in person_lists[person]:
+                offsets[movie + 1] += 1
+        for i in range(num_movies):
+            offsets[i + 1] += offsets[i]
+        stars = array(INDEX_TYPE, [0]) * person_lists.count
+        cursor = array(OFFSET_TYPE, offsets[:-1])
+        for person in range(num_people):
+            for movie in person_lists[person]:
+                stars[cursor[movie]] = person
+                cursor[movie] += 1
+        del cursor
+        self.movie_lists = CompressedLists.encode(_rows(offsets, stars))
+        self._drop_csr()
+
+    def _compress(self, person_offsets, person_movies, movie_offsets, movie_stars):
+        self.person_lists = CompressedLists.encode(_rows(person_offsets, person_movies))
+        self.movie_lists = CompressedLists.encode(_rows(movie_offsets, movie_stars))
+        self._drop_csr()
+
+    def _drop_csr(self):
+        self.person_offsets = self.person_movies = None
+        self.movie_offsets = self.movie_stars = None
+
+    @property
+    def num_stars(self):
+        return self.person_lists.count
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices person `person` starred in.
+        """
+        if person in self.patched_movies:
+            return self.patched_movies[person]
+        return self.person_lists[person]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices who starred in movie `movie`.
+        """
+        if movie in self.patched_stars:
+            return self.patched_stars[movie]
+        return self.movie_lists[movie]
+
+    def csr(self):
+        self.consolidate()
+        return self.person_lists.decode() + self.movie_lists.decode()
+
+    def adjacency_bytes(self):
+        return self.person_lists.nbytes() + self.movie_lists.nbytes()
+
+
+def _rows(offsets, values):
+    """
+    Yields the CSR rows values[offsets[i]:offsets[i + 1]].
+    """
+    for i in range(len(offsets) - 1):
+        yield values[offsets[i]:offsets[i + 1]]
+
+
+def _index(lengths, shift):
+    """
+    Block index over lists of the given encoded lengths: the byte offset
+    of every 2**shift-th list, and each list's offset from its block's
+    start, with one entry past the last list. None if an offset needs
+    more than 16 bits.
+    """
+    blocks = array(OFFSET_TYPE)
+    relative = array("H")
+    mask = (1 << shift) - 1
+    position = 0
+    for i in range(len(lengths) + 1):
+        if not i & mask:
+            blocks.append(position)
+        offset = position - blocks[-1]
+        if offset > 0xFFFF:
+            return None
+        relative.append(offset)
+        if i < len(lengths):
+            position += lengths[i]
+    return blocks, relative
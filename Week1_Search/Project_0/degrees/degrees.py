@@ -1,6 +1,20 @@
 import csv
 import sys
+from itertools import islice
 
+import paths
+import reach
+import search
+import snapshot
+from cache import PathCache
+from components import Components
+from compressed import CompressedGraph
+from filters import FilteredGraph
+from graph import CompactGraph
+from instrument import JsonLinesProbe, ProfileProbe
+from landmarks import LandmarkOracle
+from nameindex import NameIndex
+from parallel import ParallelSearch
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +26,56 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed store, set when loading with compact=True or
+# from a snapshot. names, people and movies then become views over it.
+graph = None
 
-def load_data(directory):
+# Search engine from search.ENGINES used on the compact store
+engine = "bfs"
+
+# components.Components over graph, so "not connected" needs no search
+components = None
+
+# Optional landmarks.LandmarkOracle over graph, see build_oracle
+oracle = None
+
+# Optional parallel.ParallelSearch over graph, see build_parallel
+parallel = None
+
+# Prefix and fuzzy name lookup over graph, see name_candidates
+name_index = None
+
+# Optional cache.PathCache of shortest_path results, see enable_cache
+cache = None
+
+# Optional instrument.Probe told about every search, see --trace/--profile
+probe = None
+
+# Data directory whose snapshot graph came from, so updates can be journaled
+snapshot_directory = None
+
+
+def load_data(directory, compact=False, progress=None, compressed=False):
     """
     Load data from CSV files into memory.
+    A fresh snapshot built by snapshot.py is used instead when present.
+    With compact=True, `progress` gets CompactGraph.from_csv's LoadStats.
+    compressed=True loads a CompressedGraph, implying compact.
     """
+    global snapshot_directory
+    cached = snapshot.load(directory)
+    if cached is not None:
+        load_compact(cached)
+        snapshot_directory = directory
+        return
+
+    if compressed:
+        load_compact(CompressedGraph.from_csv(directory, progress=progress))
+        return
+    if compact:
+        load_compact(CompactGraph.from_csv(directory, progress=progress))
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,40 +111,176 @@ def load_data(directory):
                 pass
 
 
+def load_compact(compact_graph):
+    """
+    Serve names, people and movies from a CompactGraph.
+    """
+    global graph, names, people, movies, name_index, components
+    graph = compact_graph
+    name_index = NameIndex(graph)
+    components = Components(graph)
+    names = graph.names_view()
+    people = graph.people_view()
+    movies = graph.movies_view()
+    if cache is not None:
+        # Enabled before loading: follow the new graph's updates
+        cache.graph = graph
+        cache.version = graph.version
+        cache.invalidate()
+
+
+def apply_updates(deltas):
+    """
+    Applies CompactGraph.apply deltas (add/remove person, movie or star)
+    to the loaded compact data without reloading it. Only the landmark
+    tables the changes can affect are recomputed, and the deltas are
+    journaled to the snapshot the data came from, if any.
+    """
+    changes = []
+    for delta in deltas:
+        changes += graph.apply(delta)
+    if cache is not None:
+        cache.invalidate()
+    if oracle is not None:
+        oracle.apply_changes(changes)
+        oracle.refresh()
+    if snapshot_directory is not None:
+        snapshot.append_journal(snapshot_directory, deltas)
+
+
+def build_oracle(k=16):
+    """
+    Precompute landmark distances over the compact store so
+    shortest_path can prune and distance_bounds answers instantly.
+    """
+    global oracle
+    oracle = LandmarkOracle(graph, k)
+
+
+def build_parallel(workers=None):
+    """
+    Expand large BFS levels of shortest_path across `workers`
+    processes (default: one per CPU). Call parallel.close() when done.
+    """
+    global parallel
+    parallel = ParallelSearch(graph, workers)
+
+
+def enable_cache(maxsize=1024, ttl=None):
+    """
+    Serve repeated shortest_path queries (in either direction) from an
+    LRU cache of up to `maxsize` pairs, each kept at most `ttl` seconds.
+    Compact data updates clear it.
+    """
+    global cache
+    cache = PathCache(maxsize, ttl, graph)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
-
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
-
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
-
-    path = shortest_path(source, target)
-
-    if path is None:
-        print("Not connected.")
-    else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+    global engine, probe
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    compressed = "--compressed" in args
+    if compressed:
+        args.remove("--compressed")
+    profile = "--profile" in args
+    if profile:
+        args.remove("--profile")
+    trace = None
+    landmarks = 0
+    workers = 0
+    for arg in list(args):
+        if arg.startswith("--engine="):
+            engine = arg[len("--engine="):]
+            args.remove(arg)
+        elif arg.startswith("--landmarks=") and arg[len("--landmarks="):].isdigit():
+            landmarks = int(arg[len("--landmarks="):])
+            args.remove(arg)
+        elif arg.startswith("--workers=") and arg[len("--workers="):].isdigit():
+            workers = int(arg[len("--workers="):])
+            args.remove(arg)
+        elif arg.startswith("--trace="):
+            trace = open(arg[len("--trace="):], "a", encoding="utf-8")
+            args.remove(arg)
+    # Whatever way main ends, release the pool, shared memory and trace file
+    try:
+        if len(args) > 1 or engine not in search.ENGINES:
+            sys.exit("Usage: python degrees.py [--compact | --compressed] [--engine=NAME] [--landmarks=K]\n"
+                     "                         [--workers=N] [--trace=events.jsonl] [--profile] [directory]\n"
+                     f"Engines (compact data only): {', '.join(search.ENGINES)}")
+        directory = args[0] if len(args) == 1 else "large"
+        if trace is not None:
+            probe = JsonLinesProbe(trace)
+        if profile:
+            probe = ProfileProbe(inner=probe)
+
+        # Load data from files into memory
+        print("Loading data...")
+        load_data(directory, compact=compact or engine != "bfs" or landmarks > 0 or workers > 0,
+                  progress=print, compressed=compressed)
+        if landmarks > 0:
+            build_oracle(landmarks)
+        if workers > 0:
+            build_parallel(workers)
+        print("Data loaded.")
+
+        name = input("Name: ")
+        source = person_id_for_name(name)
+        if source is None:
+            sys.exit(not_found_message(name))
+        name = input("Name: ")
+        target = person_id_for_name(name)
+        if target is None:
+            sys.exit(not_found_message(name))
+
+        path = shortest_path(source, target)
+
+        if path is None:
+            print("Not connected.")
+        else:
+            degrees = len(path)
+            print(f"{degrees} degrees of separation.")
+            path = [(None, source)] + path
+            for i in range(degrees):
+                person1 = people[path[i][1]]["name"]
+                person2 = people[path[i + 1][1]]["name"]
+                movie = movies[path[i + 1][0]]["title"]
+                print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+        if profile:
+            print(probe.report())
+    finally:
+        if trace is not None:
+            trace.close()
+        if parallel is not None:
+            parallel.close()
 
 
 def shortest_path(source, target):
+    if cache is not None:
+        return cache.lookup(source, target, search_path)
+    return search_path(source, target)
+
+
+def search_path(source, target):
+    if graph is not None:
+        source_index = _person_index(source)
+        target_index = _person_index(target)
+        if not components.connected(source_index, target_index):
+            return None
+        if oracle is not None:
+            path = oracle.shortest_path(source_index, target_index, probe=probe)
+        elif parallel is not None:
+            path = parallel.shortest_path(source_index, target_index, probe=probe)
+        else:
+            path = search.ENGINES[engine](graph, source_index, target_index, probe=probe)
+        return search.path_to_ids(graph, path)
+
     print(f"Starting search from {source} to {target}")
+    if probe is not None:
+        probe.start("dict", None, source, target)
     explored_nodes = 0
     # Initialize the frontier using the starting node
     start = Node(state=source, parent=None, action=None)
@@ -96,14 +291,16 @@ def shortest_path(source, target):
 
     # Initialize an empty explored set
     explored = set()
+    # Movies whose stars were already added; each is expanded once
+    explored_movies = set()
 
     # Keep looping until solution is found
     while not frontier.empty():
         # Remove a node from the frontier
         node = frontier.remove()
         explored_nodes += 1
-        if explored_nodes % 1111 == 0:
-            print(f"\nExploring node #{explored_nodes}")
+        if probe is not None and explored_nodes % probe.interval == 0:
+            probe.progress(explored_nodes, len(frontier.frontier))
 
         # If the node contains the target state, return the solution
         if node.state == target:
@@ -115,28 +312,133 @@ def shortest_path(source, target):
                 node = node.parent
             path.reverse()
             print(f"Solution path: {path}")
+            if probe is not None:
+                probe.finish(path)
             return path  # Returns a list of (movie_id, person_id) tuples
 
         # Mark node as explored
         explored.add(node.state)
         # print(f"Marked {node.state} as explored.")
 
-        # Add neighbors to the frontier
-        neighbors = neighbors_for_person(node.state)
-        # print(f"Neighbors found: {neighbors}")
-        for action, state in neighbors:
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state=state, parent=node, action=action)
-                frontier.add(child)
-                # print(f"Added to frontier: {state} via action {action}")
-            # else:
-            # print(f"Already in frontier or explored: {state}")
+        # Add neighbors to the frontier, one movie at a time. A movie
+        # reached again through another of its stars adds nobody new.
+        for action in people[node.state]["movies"]:
+            if action in explored_movies:
+                continue
+            explored_movies.add(action)
+            for state in movies[action]["stars"]:
+                if not frontier.contains_state(state) and state not in explored:
+                    child = Node(state=state, parent=node, action=action)
+                    frontier.add(child)
 
     # If no path found
     print("No connection found.")
+    if probe is not None:
+        probe.finish(None)
     return None
 
 
+def constrained_path(source, target, years=None, avoid_movies=(), avoid_people=()):
+    """
+    Like shortest_path, but only through movies released within `years`,
+    a (first, last) pair with either end None, and never through the
+    given movie or person ids. Needs compact data.
+    """
+    view, source_index, target_index = _filtered(source, target, years, avoid_movies, avoid_people)
+    if not components.connected(source_index, target_index):
+        return None
+    # Landmark bounds and the parallel search assume the whole graph
+    path = search.ENGINES[engine](view, source_index, target_index, probe=probe)
+    return search.path_to_ids(graph, path)
+
+
+def shortest_paths(source, target, limit=10, years=None, avoid_movies=(), avoid_people=()):
+    """
+    Returns up to `limit` different shortest paths between two person ids,
+    as lists of (movie_id, person_id) pairs; [] if not connected.
+    Takes the same constraints as constrained_path.
+    """
+    view, source_index, target_index = _filtered(source, target, years, avoid_movies, avoid_people)
+    if not components.connected(source_index, target_index):
+        return []
+    found = paths.all_shortest_paths(view, source_index, target_index)
+    return [search.path_to_ids(graph, path) for path in islice(found, limit)]
+
+
+def k_shortest_paths(source, target, k=10, years=None, avoid_movies=(), avoid_people=()):
+    """
+    Like shortest_paths, but once the shortest paths run out, continues
+    with the next shortest, up to `k` paths in order of length.
+    """
+    view, source_index, target_index = _filtered(source, target, years, avoid_movies, avoid_people)
+    if not components.connected(source_index, target_index):
+        return []
+    found = paths.k_shortest_paths(view, source_index, target_index, k)
+    return [search.path_to_ids(graph, path) for path in found]
+
+
+def people_within(source, targets, max_depth=None, with_paths=False):
+    """
+    Returns {target id: degrees} for the person ids in `targets` within
+    `max_depth` degrees of `source`, from one bounded search; with
+    `with_paths`, each maps to its (movie_id, person_id) path instead.
+    Targets outside source's component are skipped without searching.
+    Needs compact data.
+    """
+    source_index = graph.person_index(source)
+    indices = {}
+    for target in targets:
+        index = graph.person_index(target)
+        if index is not None and components.connected(source_index, index):
+            indices[index] = target
+    if with_paths:
+        found = reach.paths_to(graph, source_index, indices, max_depth)
+        return {indices[index]: search.path_to_ids(graph, path) for index, path in found.items()}
+    found = reach.distances_to(graph, source_index, indices, max_depth)
+    return {indices[index]: distance for index, distance in found.items()}
+
+
+def _filtered(source, target, years, avoid_movies, avoid_people):
+    """
+    Returns (graph or filtered view, source index, target index).
+    """
+    view = graph
+    if years is not None or avoid_movies or avoid_people:
+        view = FilteredGraph.where(graph, years, avoid_movies, avoid_people)
+    return view, graph.person_index(source), graph.person_index(target)
+
+
+def distance_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two person ids from the landmark oracle, without searching.
+    Both are None if the people are provably not connected;
+    upper alone is None if no landmark reaches both.
+    """
+    return oracle.bounds(graph.person_index(source), graph.person_index(target))
+
+
+def name_candidates(text, limit=10):
+    """
+    Returns up to `limit` ranked {"id", "name", "birth", "movies"} dicts
+    for people matching `text` exactly, by prefix or approximately.
+    Never prompts; needs compact data.
+    """
+    return name_index.candidates(text, limit)
+
+
+def not_found_message(name):
+    """
+    "Person not found." plus close matches when the name index is loaded.
+    """
+    message = "Person not found."
+    if name_index is not None:
+        suggestions = [candidate["name"] for candidate in name_index.candidates(name, limit=5)]
+        if suggestions:
+            message += f" Did you mean: {', '.join(suggestions)}?"
+    return message
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -168,6 +470,13 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        person = _person_index(person_id)
+        return {
+            (graph.movie_ids[movie], graph.person_ids[star])
+            for movie, star in graph.neighbors(person)
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -176,5 +485,16 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def _person_index(person_id):
+    """
+    Returns the compact index of `person_id`; KeyError if unknown,
+    as the dict data raises.
+    """
+    person = graph.person_index(person_id)
+    if person is None:
+        raise KeyError(person_id)
+    return person
+
+
 if __name__ == "__main__":
     main()
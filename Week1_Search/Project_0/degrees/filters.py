@@ -0,0 +1,121 @@
+import weakref
+
+# Filtered views of a CompactGraph for constrained queries, such as
+# "only movies after 1990" or "avoid this person".
+#
+# A predicate on movie or person indices is evaluated once per movie or
+# person into a byte mask. The view's movies_of and stars_of drop masked
+# entries as the engines read them, so every engine, paths.py and the
+# probes work on a view unchanged, and the graph itself is never copied.
+#
+# FilteredGraph.where never runs a predicate over the whole graph: avoid
+# lists clear their few entries in an all-ones mask, and year-range
+# masks are built once per range and graph version and then shared.
+
+# Most year-range masks kept per graph; the least recently used go first
+YEAR_MASKS = 32
+
+
+class FilteredGraph():
+    """
+    A CompactGraph restricted to the movies and people whose predicates
+    return true. Everything but adjacency is read from the underlying
+    graph. Build a new view after updating the graph.
+    """
+
+    def __init__(self, graph, movies=None, people=None):
+        self.graph = graph
+        # None means nothing of that kind is filtered out; `movies` and
+        # `people` may also be ready-made masks
+        self.movie_mask = _compile(movies, graph.num_movies)
+        self.person_mask = _compile(people, graph.num_people)
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    @classmethod
+    def where(cls, graph, years=None, avoid_movies=(), avoid_people=()):
+        """
+        View keeping movies released within `years`, a (first, last) pair
+        with either end None, and leaving out the given IMDB movie and
+        person ids. Movies without a usable year fail any year range.
+        """
+        movies = None
+        if years is not None:
+            movies = _year_mask(graph, tuple(years))
+        if avoid_movies:
+            movies = bytearray(b"\x01") * graph.num_movies if movies is None else bytearray(movies)
+            _clear(movies, map(graph.movie_index, avoid_movies))
+
+        people = None
+        if avoid_people:
+            people = bytearray(b"\x01") * graph.num_people
+            _clear(people, map(graph.person_index, avoid_people))
+
+        return cls(graph, movies, people)
+
+    def movies_of(self, person):
+        person_mask = self.person_mask
+        if person_mask is not None and not person_mask[person]:
+            return ()
+        movies = self.graph.movies_of(person)
+        mask = self.movie_mask
+        if mask is None:
+            return movies
+        return [movie for movie in movies if mask[movie]]
+
+    def stars_of(self, movie):
+        movie_mask = self.movie_mask
+        if movie_mask is not None and not movie_mask[movie]:
+            return ()
+        stars = self.graph.stars_of(movie)
+        mask = self.person_mask
+        if mask is None:
+            return stars
+        return [star for star in stars if mask[star]]
+
+    def neighbors(self, person):
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def allows_person(self, person):
+        return self.person_mask is None or bool(self.person_mask[person])
+
+
+def _compile(predicate, size):
+    if predicate is None or isinstance(predicate, (bytes, bytearray)):
+        return predicate
+    return bytearray(1 if predicate(i) else 0 for i in range(size))
+
+
+def _clear(mask, indices):
+    for index in indices:
+        # Unknown ids have no index and nothing to leave out
+        if index is not None:
+            mask[index] = 0
+
+
+# graph -> (graph.version, {(first, last): mask})
+_year_masks = weakref.WeakKeyDictionary()
+
+
+def _year_mask(graph, years):
+    """
+    Returns the shared, read-only movie mask for a (first, last) range.
+    """
+    version, masks = _year_masks.get(graph, (None, None))
+    if version != graph.version:
+        masks = {}
+        _year_masks[graph] = (graph.version, masks)
+    mask = masks.pop(years, None)
+    if mask is None:
+        first, last = years
+        low = float("-inf") if first is None else first
+        high = float("inf") if last is None else last
+        mask = bytes(1 if year.isdigit() and low <= int(year) <= high else 0
+                     for year in graph.movie_years)
+        if len(masks) >= YEAR_MASKS:
+            del masks[next(iter(masks))]
+    masks[years] = mask
+    return mask
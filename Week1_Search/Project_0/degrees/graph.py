@@ -0,0 +1,623 @@
+import csv
+import os
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from itertools import islice
+
+# Array typecodes: dense person/movie indices fit in a C int,
+# offsets into the adjacency arrays get a 64-bit integer.
+INDEX_TYPE = "i"
+OFFSET_TYPE = "q"
+
+
+class CompactGraph():
+    """
+    Bipartite person/movie graph with IMDB ids interned to dense integers.
+
+    Adjacency is stored CSR-style: the movies of person i are
+    person_movies[person_offsets[i]:person_offsets[i + 1]] and the stars
+    of movie j are movie_stars[movie_offsets[j]:movie_offsets[j + 1]].
+    Both neighbor lists are sorted and free of duplicates.
+    """
+
+    def __init__(self):
+        # Index -> attribute tables
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # CSR adjacency
+        self.person_offsets = array(OFFSET_TYPE, [0])
+        self.person_movies = array(INDEX_TYPE)
+        self.movie_offsets = array(OFFSET_TYPE, [0])
+        self.movie_stars = array(INDEX_TYPE)
+
+        # IMDB id -> index, built on first lookup
+        self._person_index = None
+        self._movie_index = None
+
+        # Index permutations sorted by IMDB id and by lowercase name.
+        # A snapshot ships them so lookups can bisect instead of
+        # building the dicts above.
+        self.person_order = None
+        self.movie_order = None
+        self.name_order = None
+
+        # Incremental updates (see apply) overlay the CSR arrays: a patched
+        # person or movie has its whole sorted neighbor list here instead.
+        self.patched_movies = {}
+        self.patched_stars = {}
+        self.removed_people = set()
+        self.removed_movies = set()
+        # Bumped by every change, so caches can tell they are out of date
+        self.version = 0
+
+        # Connected component label per person (see components.py),
+        # shipped by snapshots; apply() drops it
+        self.component_labels = None
+
+    @classmethod
+    def from_csv(cls, directory, progress=None, chunk_rows=100000):
+        """
+        Load people.csv, movies.csv and stars.csv from `directory`.
+
+        Rows are read as plain tuples, `chunk_rows` at a time, straight
+        into the id tables and edge arrays. Rows with missing columns,
+        repeated ids, and star rows naming an unknown person or movie are
+        rejected and counted. `progress`, if given, is called with the
+        LoadStats after every chunk. The stats end up in graph.load_stats.
+        """
+        graph = cls()
+        stats = LoadStats()
+        person_index = {}
+        movie_index = {}
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+
+        def add_people(rows, columns):
+            id_column, name_column, birth_column = columns
+            for row in rows:
+                person_id = row[id_column]
+                if person_id in person_index:
+                    stats.reject()
+                    continue
+                person_index[person_id] = len(graph.person_ids)
+                graph.person_ids.append(person_id)
+                graph.person_names.append(row[name_column])
+                graph.person_births.append(row[birth_column])
+
+        def add_movies(rows, columns):
+            id_column, title_column, year_column = columns
+            for row in rows:
+                movie_id = row[id_column]
+                if movie_id in movie_index:
+                    stats.reject()
+                    continue
+                movie_index[movie_id] = len(graph.movie_ids)
+                graph.movie_ids.append(movie_id)
+                graph.movie_titles.append(row[title_column])
+                graph.movie_years.append(row[year_column])
+
+        def add_stars(rows, columns):
+            person_column, movie_column = columns
+            for row in rows:
+                person = person_index.get(row[person_column])
+                movie = movie_index.get(row[movie_column])
+                if person is None or movie is None:
+                    stats.reject()
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+        _stream(f"{directory}/people.csv", ("id", "name", "birth"),
+                add_people, stats, progress, chunk_rows)
+        _stream(f"{directory}/movies.csv", ("id", "title", "year"),
+                add_movies, stats, progress, chunk_rows)
+        _stream(f"{directory}/stars.csv", ("person_id", "movie_id"),
+                add_stars, stats, progress, chunk_rows)
+
+        graph._person_index = person_index
+        graph._movie_index = movie_index
+        graph.set_edges(edge_people, edge_movies)
+        graph.load_stats = stats
+        return graph
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build from degrees-style `people` and `movies` dicts,
+        for scripts that already loaded the CSV files that way.
+        """
+        graph = cls()
+        for person_id, person in people.items():
+            graph.person_ids.append(person_id)
+            graph.person_names.append(person["name"])
+            graph.person_births.append(person["birth"])
+        for movie_id, movie in movies.items():
+            graph.movie_ids.append(movie_id)
+            graph.movie_titles.append(movie["title"])
+            graph.movie_years.append(movie["year"])
+
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+        for person_id, person in people.items():
+            index = graph.person_index(person_id)
+            for movie_id in person["movies"]:
+                movie = graph.movie_index(movie_id)
+                if movie is not None:
+                    edge_people.append(index)
+                    edge_movies.append(movie)
+
+        graph.set_edges(edge_people, edge_movies)
+        return graph
+
+    def set_edges(self, edge_people, edge_movies):
+        """
+        Build both CSR adjacency halves from parallel arrays of
+        (person index, movie index) edges. Duplicate edges are dropped.
+        """
+        num_people = len(self.person_ids)
+        num_movies = len(self.movie_ids)
+
+        offsets, targets = _group(edge_people, edge_movies, num_people)
+        self.person_offsets, self.person_movies = _sort_unique(offsets, targets)
+
+        # Re-derive the movie half from the deduplicated person half so both
+        # agree; walking people in order keeps every star list sorted.
+        edge_people = array(INDEX_TYPE)
+        for person in range(num_people):
+            count = self.person_offsets[person + 1] - self.person_offsets[person]
+            edge_people.extend([person] * count)
+        self.movie_offsets, self.movie_stars = _group(
+            self.person_movies, edge_people, num_movies
+        )
+
+    def consolidate(self):
+        """
+        Folds incremental updates back into fresh CSR arrays.
+        """
+        if not self.patched_movies and not self.patched_stars:
+            return
+        edge_people = array(INDEX_TYPE)
+        edge_movies = array(INDEX_TYPE)
+        for person in range(self.num_people):
+            movies = self.movies_of(person)
+            edge_people.extend([person] * len(movies))
+            edge_movies.extend(movies)
+        self.patched_movies = {}
+        self.patched_stars = {}
+        self.set_edges(edge_people, edge_movies)
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    @property
+    def num_stars(self):
+        return len(self.person_movies)
+
+    def csr(self):
+        """
+        Returns (person_offsets, person_movies, movie_offsets, movie_stars)
+        with incremental updates folded in.
+        """
+        self.consolidate()
+        return self.person_offsets, self.person_movies, self.movie_offsets, self.movie_stars
+
+    def adjacency_bytes(self):
+        return sum(len(values) * values.itemsize for values in
+                   (self.person_offsets, self.person_movies, self.movie_offsets, self.movie_stars))
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index for an IMDB person id, or None.
+        """
+        person = self._find_person(person_id)
+        return None if person in self.removed_people else person
+
+    def _find_person(self, person_id):
+        if self._person_index is None:
+            if self.person_order is not None:
+                return _bisect_id(self.person_order, self.person_ids, person_id)
+            self._person_index = {pid: i for i, pid in enumerate(self.person_ids)}
+        return self._person_index.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index for an IMDB movie id, or None.
+        """
+        movie = self._find_movie(movie_id)
+        return None if movie in self.removed_movies else movie
+
+    def _find_movie(self, movie_id):
+        if self._movie_index is None:
+            if self.movie_order is not None:
+                return _bisect_id(self.movie_order, self.movie_ids, movie_id)
+            self._movie_index = {mid: i for i, mid in enumerate(self.movie_ids)}
+        return self._movie_index.get(movie_id)
+
+    def build_orders(self):
+        """
+        Computes person_order, movie_order and name_order.
+        """
+        self.person_order = _argsort(self.person_ids)
+        self.movie_order = _argsort(self.movie_ids)
+        self.name_order = _argsort([name.lower() for name in self.person_names])
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices person `person` starred in.
+        """
+        if person in self.patched_movies:
+            return self.patched_movies[person]
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices who starred in movie `movie`.
+        """
+        if movie in self.patched_stars:
+            return self.patched_stars[movie]
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def movie_count(self, person):
+        return len(self.movies_of(person))
+
+    def neighbors(self, person):
+        """
+        Yields (movie index, person index) pairs for people
+        who starred with person `person`, including `person` itself.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def apply(self, delta):
+        """
+        Applies one update to the graph in place. `delta` is a dict with
+        an "op" of add_person (id, name, birth), add_movie (id, title,
+        year), add_star (person_id, movie_id), or the matching remove_*.
+        Adding something that exists, or removing something that does not,
+        changes nothing; re-adding a removed id restores it.
+        Returns the star edges it changed as (person, movie, added, co_stars)
+        tuples, co_stars being the movie's other stars at that moment.
+        """
+        op = delta["op"]
+        if op == "add_person":
+            self._add_person(delta["id"], delta["name"], delta["birth"])
+            changes = []
+        elif op == "add_movie":
+            self._add_movie(delta["id"], delta["title"], delta["year"])
+            changes = []
+        elif op == "add_star":
+            changes = self._set_star(delta["person_id"], delta["movie_id"], True)
+        elif op == "remove_star":
+            changes = self._set_star(delta["person_id"], delta["movie_id"], False)
+        elif op == "remove_person":
+            person = self.person_index(delta["id"])
+            changes = []
+            if person is not None:
+                for movie in list(self.movies_of(person)):
+                    changes += self._set_star(delta["id"], self.movie_ids[movie], False)
+                self.removed_people.add(person)
+        elif op == "remove_movie":
+            movie = self.movie_index(delta["id"])
+            changes = []
+            if movie is not None:
+                for star in list(self.stars_of(movie)):
+                    changes += self._set_star(self.person_ids[star], delta["id"], False)
+                self.removed_movies.add(movie)
+        else:
+            raise ValueError(f"unknown update op: {op}")
+        self.version += 1
+        self.component_labels = None
+        return changes
+
+    def _add_person(self, person_id, name, birth):
+        person = self._find_person(person_id)
+        if person is not None:
+            self.removed_people.discard(person)
+            return
+        person = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.patched_movies[person] = array(INDEX_TYPE)
+        if self._person_index is not None:
+            self._person_index[person_id] = person
+        if self.person_order is not None:
+            self.person_order = _insert_sorted(self.person_order, person, self.person_ids.__getitem__)
+        if self.name_order is not None:
+            self.name_order = _insert_sorted(
+                self.name_order, person, lambda i: self.person_names[i].lower()
+            )
+
+    def _add_movie(self, movie_id, title, year):
+        movie = self._find_movie(movie_id)
+        if movie is not None:
+            self.removed_movies.discard(movie)
+            return
+        movie = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.patched_stars[movie] = array(INDEX_TYPE)
+        if self._movie_index is not None:
+            self._movie_index[movie_id] = movie
+        if self.movie_order is not None:
+            self.movie_order = _insert_sorted(self.movie_order, movie, self.movie_ids.__getitem__)
+
+    def _set_star(self, person_id, movie_id, added):
+        person = self.person_index(person_id)
+        movie = self.movie_index(movie_id)
+        if person is None or movie is None:
+            return []
+        movies = self.movies_of(person)
+        position = bisect_left(movies, movie)
+        present = position < len(movies) and movies[position] == movie
+        if present == added:
+            return []
+
+        movies = self.patched_movies.setdefault(person, array(INDEX_TYPE, movies))
+        stars = self.patched_stars.setdefault(movie, array(INDEX_TYPE, self.stars_of(movie)))
+        if added:
+            movies.insert(position, movie)
+            stars.insert(bisect_left(stars, person), person)
+        else:
+            del movies[position]
+            del stars[bisect_left(stars, person)]
+        return [(person, movie, added, tuple(star for star in stars if star != person))]
+
+    def names(self):
+        """
+        Returns a names dict (lowercase name -> set of person ids)
+        as degrees.load_data builds it.
+        """
+        names = {}
+        for person_id, name in zip(self.person_ids, self.person_names):
+            names.setdefault(name.lower(), set()).add(person_id)
+        return names
+
+    def names_view(self):
+        return NamesView(self)
+
+    def people_view(self):
+        return PeopleView(self)
+
+    def movies_view(self):
+        return MoviesView(self)
+
+
+class LoadStats():
+    """
+    Per-file row and rejected-row counts for CompactGraph.from_csv.
+    """
+
+    def __init__(self):
+        self.file = None
+        self.rows = {}
+        self.rejected = {}
+        self.started = {}
+        self.elapsed = {}
+
+    def start(self, file):
+        self.file = file
+        self.rows[file] = 0
+        self.rejected[file] = 0
+        self.started[file] = time.perf_counter()
+        self.elapsed[file] = 0.0
+
+    def add_rows(self, count):
+        self.rows[self.file] += count
+        self.elapsed[self.file] = time.perf_counter() - self.started[self.file]
+
+    def reject(self, count=1):
+        self.rejected[self.file] += count
+
+    def rows_per_second(self, file=None):
+        file = file or self.file
+        return self.rows[file] / self.elapsed[file] if self.elapsed[file] else 0.0
+
+    def __str__(self):
+        return (f"{self.file}: {self.rows[self.file]} rows, "
+                f"{self.rejected[self.file]} rejected, "
+                f"{self.rows_per_second():.0f} rows/sec")
+
+
+class NamesView(Mapping):
+    """
+    Read-only stand-in for the degrees `names` dict, answered by
+    bisecting name_order instead of holding a dict of every name.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        if graph.name_order is None:
+            graph.build_orders()
+        self._len = None
+        self._version = None
+
+    def _lower_name(self, person):
+        return self.graph.person_names[person].lower()
+
+    def __getitem__(self, name):
+        order = self.graph.name_order
+        start = bisect_left(order, name, key=self._lower_name)
+        end = bisect_right(order, name, lo=start, key=self._lower_name)
+        removed = self.graph.removed_people
+        person_ids = {
+            self.graph.person_ids[person] for person in order[start:end] if person not in removed
+        }
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __iter__(self):
+        previous = None
+        removed = self.graph.removed_people
+        for person in self.graph.name_order:
+            if person in removed:
+                continue
+            name = self._lower_name(person)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        if self._len is None or self._version != self.graph.version:
+            self._len = sum(1 for _ in self)
+            self._version = self.graph.version
+        return self._len
+
+
+class PeopleView(Mapping):
+    """
+    Read-only stand-in for the degrees `people` dict.
+    Each lookup builds the {"name", "birth", "movies"} record on demand.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        removed = self.graph.removed_people
+        for person, person_id in enumerate(self.graph.person_ids):
+            if person not in removed:
+                yield person_id
+
+    def __len__(self):
+        return self.graph.num_people - len(self.graph.removed_people)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only stand-in for the degrees `movies` dict.
+    Each lookup builds the {"title", "year", "stars"} record on demand.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[star] for star in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        removed = self.graph.removed_movies
+        for movie, movie_id in enumerate(self.graph.movie_ids):
+            if movie not in removed:
+                yield movie_id
+
+    def __len__(self):
+        return self.graph.num_movies - len(self.graph.removed_movies)
+
+
+def _stream(path, names, handle, stats, progress, chunk_rows):
+    """
+    Feeds `path` to handle(rows, columns) in chunks of tuples, where
+    columns are the positions of the `names` header fields.
+    Rows too short to hold every column are rejected.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        stats.start(os.path.basename(path))
+        header = next(reader, [])
+        columns = tuple(header.index(name) for name in names)
+        width = max(columns) + 1
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                break
+            rows = [row for row in chunk if len(row) >= width]
+            stats.reject(len(chunk) - len(rows))
+            handle(rows, columns)
+            stats.add_rows(len(chunk))
+            if progress is not None:
+                progress(stats)
+
+
+def _insert_sorted(order, index, key):
+    """
+    Inserts `index` into the sorted permutation `order`, copying a
+    read-only (snapshot) permutation into an array first.
+    """
+    if not isinstance(order, array):
+        order = array(INDEX_TYPE, order)
+    order.insert(bisect_left(order, key(index), key=key), index)
+    return order
+
+
+def _argsort(values):
+    """
+    Returns an index array that orders `values`.
+    """
+    return array(INDEX_TYPE, sorted(range(len(values)), key=values.__getitem__))
+
+
+def _bisect_id(order, ids, key):
+    """
+    Finds `key` in `ids` through the sorted permutation `order`.
+    """
+    position = bisect_left(order, key, key=ids.__getitem__)
+    if position < len(order) and ids[order[position]] == key:
+        return order[position]
+    return None
+
+
+def _group(sources, targets, num_sources):
+    """
+    Counting sort of parallel (source, target) arrays into CSR form.
+    Returns (offsets, targets grouped by source).
+    """
+    offsets = array(OFFSET_TYPE, [0]) * (num_sources + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(num_sources):
+        offsets[i + 1] += offsets[i]
+
+    grouped = array(INDEX_TYPE, [0]) * len(targets)
+    cursor = array(OFFSET_TYPE, offsets[:-1])
+    for source, target in zip(sources, targets):
+        grouped[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, grouped
+
+
+def _sort_unique(offsets, targets):
+    """
+    Sorts every CSR row and drops repeated entries.
+    """
+    new_offsets = array(OFFSET_TYPE, [0])
+    new_targets = array(INDEX_TYPE)
+    for i in range(len(offsets) - 1):
+        row = targets[offsets[i]:offsets[i + 1]]
+        new_targets.extend(sorted(set(row)))
+        new_offsets.append(len(new_targets))
+    return new_offsets, new_targets
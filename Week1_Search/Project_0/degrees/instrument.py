@@ -0,0 +1,152 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+
+# Instrumentation hooks for the search engines.
+#
+# Engines take an optional `probe` and, when one is given, report:
+#   start(engine, graph, source, target)   once per search
+#   level(side, depth, expanded, discovered, scanned)
+#       after expanding a whole level: the people expanded, how many
+#       new people (at `depth`) they discovered and how many neighbor
+#       list entries the engine read doing so; side is "forward" or
+#       "backward" in bidirectional search
+#   meet(person, forward_depth, backward_depth)
+#       when the two sides of a bidirectional search meet
+#   progress(expanded, frontier)
+#       every `interval` expansions, from searches without levels
+#   finish(path)                           once per search
+#
+# Without a probe the engines never call into this module, so default
+# searches pay nothing. Probe itself keeps the clock and the running
+# totals; subclasses only decide what to do with each finished event
+# dict in record().
+
+
+class Probe():
+    """
+    Collector that turns hook calls into event dicts and discards them.
+    Bookkeeping happens after the level's clock has stopped, so a probe
+    does not inflate the timings it reports.
+    """
+
+    # Expansions between progress() calls
+    interval = 1111
+
+    def __init__(self):
+        self._started = None
+        self._last = None
+        self._totals = None
+
+    def start(self, engine, graph, source, target):
+        self._totals = {"levels": 0, "expanded": 0, "discovered": 0, "scanned": 0}
+        self.record({"event": "start", "engine": engine, "source": source, "target": target})
+        self._started = self._last = time.perf_counter()
+
+    def level(self, side, depth, expanded, discovered, scanned=0):
+        now = time.perf_counter()
+        seconds = now - self._last
+        totals = self._totals
+        totals["levels"] += 1
+        totals["expanded"] += len(expanded)
+        totals["discovered"] += discovered
+        totals["scanned"] += scanned
+        self.record({
+            "event": "level", "side": side, "depth": depth,
+            "expanded": len(expanded), "discovered": discovered,
+            "scanned": scanned, "ms": round(seconds * 1000, 3),
+        })
+        # Restart the clock after our own bookkeeping
+        self._last = time.perf_counter()
+
+    def meet(self, person, forward_depth, backward_depth):
+        self.record({"event": "meet", "person": person,
+                     "forward_depth": forward_depth, "backward_depth": backward_depth})
+
+    def progress(self, expanded, frontier):
+        now = time.perf_counter()
+        self._totals["expanded"] = expanded
+        self.record({"event": "progress", "expanded": expanded, "frontier": frontier,
+                     "ms": round((now - self._last) * 1000, 3)})
+        self._last = time.perf_counter()
+
+    def finish(self, path):
+        event = {"event": "finish", "degrees": None if path is None else len(path),
+                 "ms": round((time.perf_counter() - self._started) * 1000, 3)}
+        event.update(self._totals)
+        self.record(event)
+
+    def record(self, event):
+        pass
+
+
+class Recorder(Probe):
+    """
+    Keeps every event in memory, in order.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def record(self, event):
+        self.events.append(event)
+
+    def searches(self):
+        """
+        Returns the finish event of every search recorded so far.
+        """
+        return [event for event in self.events if event["event"] == "finish"]
+
+
+class JsonLinesProbe(Probe):
+    """
+    Writes every event as one JSON line, with a wall-clock timestamp,
+    to an open text file.
+    """
+
+    def __init__(self, out):
+        super().__init__()
+        self.out = out
+
+    def record(self, event):
+        event["time"] = round(time.time(), 6)
+        self.out.write(json.dumps(event) + "\n")
+
+
+class ProfileProbe(Probe):
+    """
+    Runs cProfile during each search and accumulates the statistics.
+    Events go to `inner`, if given, so profiling can be combined
+    with another collector.
+    """
+
+    def __init__(self, inner=None):
+        super().__init__()
+        self.inner = inner
+        self.profile = cProfile.Profile()
+
+    def start(self, engine, graph, source, target):
+        super().start(engine, graph, source, target)
+        self.profile.enable()
+
+    def finish(self, path):
+        self.profile.disable()
+        super().finish(path)
+
+    def record(self, event):
+        if self.inner is not None:
+            self.inner.record(event)
+
+    def report(self, sort="cumulative", limit=20):
+        """
+        Returns the pstats report of everything profiled so far.
+        """
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
@@ -0,0 +1,199 @@
+from search import Workspace, distances_from, expand_levels, unwind_path
+
+# Landmark distance oracle for repeated queries on one graph.
+#
+# A BFS sweep from each of k well-connected landmark people gives d(L, v)
+# for every person v. By the triangle inequality, for any landmark L
+#     |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+# so the best bounds over all landmarks cost O(k) per pair.
+
+
+class LandmarkOracle():
+    """
+    Distance bounds and a pruned exact search, backed by
+    one compact distance array per landmark.
+    """
+
+    def __init__(self, graph, k=16):
+        self.graph = graph
+        self.landmarks = select_landmarks(graph, k)
+        self.distances = []
+        for landmark in self.landmarks:
+            # int8, or int16 past 127 degrees from this landmark
+            self.distances.append(distances_from(graph, landmark, widen=True))
+        # Largest finite distance from each landmark
+        self.radii = [max(distances) for distances in self.distances]
+        # Positions of landmark tables made stale by graph updates
+        self.stale = set()
+
+    def apply_changes(self, changes):
+        """
+        Takes the edge changes returned by CompactGraph.apply and marks
+        the landmark tables they can affect.
+        Call refresh() before answering queries again.
+        """
+        for distances in self.distances:
+            if len(distances) < self.graph.num_people:
+                distances.extend([-1] * (self.graph.num_people - len(distances)))
+        for person, _, added, co_stars in changes:
+            group = co_stars + (person,)
+            for i, distances in enumerate(self.distances):
+                if i not in self.stale and _affects(distances, person, group, added):
+                    self.stale.add(i)
+
+    def refresh(self):
+        """
+        Recomputes the stale landmark tables only.
+        """
+        for i in sorted(self.stale):
+            distances = distances_from(self.graph, self.landmarks[i], widen=True)
+            self.distances[i] = distances
+            self.radii[i] = max(distances)
+        self.stale.clear()
+
+    def lower_bound(self, source, target):
+        """
+        Returns a lower bound on the degrees between two person indices,
+        or None if some landmark proves they are not connected.
+        """
+        bound = 0
+        for distances in self.distances:
+            from_source, from_target = distances[source], distances[target]
+            if (from_source == -1) != (from_target == -1):
+                return None
+            if from_source != -1:
+                bound = max(bound, abs(from_source - from_target))
+        return bound
+
+    def upper_bound(self, source, target):
+        """
+        Returns an upper bound on the degrees between two person indices,
+        or None if no landmark reaches both.
+        """
+        bound = None
+        for distances in self.distances:
+            from_source, from_target = distances[source], distances[target]
+            if from_source != -1 and from_target != -1:
+                if bound is None or from_source + from_target < bound:
+                    bound = from_source + from_target
+        return bound
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds, (None, None) if provably not connected.
+        upper is None when no landmark reaches both people.
+        """
+        lower = self.lower_bound(source, target)
+        if lower is None:
+            return None, None
+        return lower, self.upper_bound(source, target)
+
+    def heuristic(self, target):
+        """
+        Returns an admissible A* heuristic h(person) for reaching `target`.
+        People a landmark proves disconnected from `target` get None.
+        """
+        return lambda person: self.lower_bound(person, target)
+
+    def shortest_path(self, source, target, workspace=None, probe=None):
+        """
+        Exact level-by-level BFS that skips any person whose depth plus
+        lower bound to `target` already exceeds the best upper bound.
+        Returns a list of (movie index, person index) pairs, or None.
+        """
+        space = Workspace.for_graph(self.graph) if workspace is None else workspace
+        if probe is not None:
+            probe.start("landmarks", self.graph, source, target)
+        path = None
+        try:
+            path = self._pruned_search(source, target, space, probe)
+            return path
+        finally:
+            space.reset()
+            if probe is not None:
+                probe.finish(path)
+
+    def _pruned_search(self, source, target, space, probe):
+        if source == target:
+            return []
+        lower, upper = self.bounds(source, target)
+        if lower is None:
+            return None
+
+        # Only landmarks that reach the target can give a finite bound,
+        # and one of them can at most prove a gap of max(radius - d, d).
+        bounding = []
+        widest = 0
+        for distances, radius in zip(self.distances, self.radii):
+            to_target = distances[target]
+            if to_target != -1:
+                bounding.append((distances, to_target))
+                widest = max(widest, radius - to_target, to_target)
+
+        def beyond(person, depth):
+            # How much further than `depth` a kept person may be from target
+            if upper - depth >= widest:
+                return False
+            return _exceeds(bounding, person, upper - depth)
+
+        levels = expand_levels(self.graph, space, [source], stop=target.__eq__,
+                               prune=None if upper is None else beyond)
+        for depth, frontier, discovered, scanned in levels:
+            if probe is not None:
+                probe.level("forward", depth, frontier, discovered, scanned)
+        if space.depth[target] == -1:
+            return None
+        return unwind_path(space.parent_person, space.parent_movie, target)
+
+
+def _affects(distances, person, group, added):
+    """
+    True if adding or removing `person` to/from a movie shared with
+    the rest of `group` can change this landmark's distances.
+    """
+    values = [distances[star] for star in group]
+    if added:
+        # A new shortcut matters unless the group was already within one
+        # degree of itself, or is out of the landmark's reach entirely
+        if all(value == -1 for value in values):
+            return False
+        return -1 in values or max(values) - min(values) > 1
+    # A lost edge matters only if it could lie on a shortest path,
+    # i.e. it joined people exactly one degree apart from the landmark
+    own = distances[person]
+    if own == -1:
+        return False
+    return any(abs(value - own) == 1 for value in values)
+
+
+def _exceeds(bounding, person, slack):
+    """
+    True if some landmark proves `person` is more than `slack`
+    degrees from the target (or cannot reach it at all).
+    """
+    for distances, to_target in bounding:
+        distance = distances[person]
+        if distance == -1 or abs(distance - to_target) > slack:
+            return True
+    return False
+
+
+def select_landmarks(graph, k):
+    """
+    Returns up to k person indices with the most co-star incidences,
+    skipping anyone who shares a movie with an already chosen landmark.
+    """
+    def degree(person):
+        return sum(len(graph.stars_of(movie)) for movie in graph.movies_of(person))
+
+    candidates = sorted(range(graph.num_people), key=degree, reverse=True)
+    landmarks = []
+    covered = set()
+    for person in candidates:
+        if len(landmarks) == k:
+            break
+        if person in covered:
+            continue
+        landmarks.append(person)
+        covered.update(star for _, star in graph.neighbors(person))
+    return landmarks
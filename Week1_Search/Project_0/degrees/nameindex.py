@@ -0,0 +1,143 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from graph import INDEX_TYPE
+
+# Name lookup for autocomplete and typo-tolerant search.
+#
+# Prefix search bisects graph.name_order, the person indices sorted by
+# lowercase name, so it needs no extra memory. Fuzzy search uses a trigram
+# index: for each three-character slice of a padded lowercase name, an
+# array of the people whose name contains it.
+
+
+class NameIndex():
+    """
+    Non-interactive person lookup by exact name, prefix or approximate name.
+    Results are dicts with the person's id, name, birth and movie count.
+    """
+
+    # Posting lists longer than this are skipped once others gave candidates
+    common_postings = 5000
+
+    def __init__(self, graph):
+        self.graph = graph
+        if graph.name_order is None:
+            graph.build_orders()
+        # trigram -> person indices, built on first fuzzy lookup
+        # and rebuilt after the graph changes
+        self._trigrams = None
+        self._version = None
+
+    def _lower_name(self, person):
+        return self.graph.person_names[person].lower()
+
+    def exact(self, name):
+        """
+        Returns every person whose name matches `name`, ignoring case.
+        """
+        order = self.graph.name_order
+        name = name.lower()
+        people = []
+        position = bisect_left(order, name, key=self._lower_name)
+        while position < len(order) and self._lower_name(order[position]) == name:
+            people.append(order[position])
+            position += 1
+        return [self.describe(person) for person in people
+                if person not in self.graph.removed_people]
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` people whose name starts with `text`,
+        in alphabetical order.
+        """
+        order = self.graph.name_order
+        text = text.lower()
+        people = []
+        position = bisect_left(order, text, key=self._lower_name)
+        while (position < len(order) and len(people) < limit
+               and self._lower_name(order[position]).startswith(text)):
+            if order[position] not in self.graph.removed_people:
+                people.append(order[position])
+            position += 1
+        return [self.describe(person) for person in people]
+
+    def fuzzy(self, text, limit=10, min_score=0.3):
+        """
+        Returns up to `limit` people ranked by trigram similarity
+        to `text` (shared / combined distinct trigrams).
+        """
+        if self._trigrams is None or self._version != self.graph.version:
+            self._trigrams = self._build_trigrams()
+            self._version = self.graph.version
+        query = trigrams(text.lower())
+        if not query:
+            return []
+
+        # Gather candidates from the rarest trigrams first; very common
+        # ones ("son", " jo") only add work once some candidates exist.
+        shared = Counter()
+        for people in sorted((self._trigrams.get(t, ()) for t in query), key=len):
+            if shared and len(people) > self.common_postings:
+                break
+            shared.update(people)
+
+        scored = []
+        for person, _ in shared.most_common(limit * 20):
+            name_trigrams = trigrams(self._lower_name(person))
+            common = len(query & name_trigrams)
+            score = common / (len(query) + len(name_trigrams) - common)
+            if score >= min_score:
+                scored.append((score, person))
+        scored.sort(key=lambda item: (-item[0], self._lower_name(item[1])))
+
+        results = []
+        for score, person in scored[:limit]:
+            result = self.describe(person)
+            result["score"] = round(score, 3)
+            results.append(result)
+        return results
+
+    def candidates(self, text, limit=10):
+        """
+        Ranked suggestions for `text`: exact matches, then prefix matches,
+        then fuzzy matches, without repeating anyone.
+        """
+        results = []
+        seen = set()
+        for group in (self.exact(text), self.prefix(text, limit), self.fuzzy(text, limit)):
+            for result in group:
+                if result["id"] not in seen and len(results) < limit:
+                    seen.add(result["id"])
+                    results.append(result)
+        return results
+
+    def describe(self, person):
+        graph = self.graph
+        return {
+            "id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": graph.movie_count(person),
+        }
+
+    def _build_trigrams(self):
+        index = {}
+        for person, name in enumerate(self.graph.person_names):
+            if person in self.graph.removed_people:
+                continue
+            for trigram in trigrams(name.lower()):
+                postings = index.get(trigram)
+                if postings is None:
+                    postings = index[trigram] = array(INDEX_TYPE)
+                postings.append(person)
+        return index
+
+
+def trigrams(text):
+    """
+    Returns the set of trigrams of `text`, padded so word starts count.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,317 @@
+import multiprocessing
+import os
+from array import array
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from graph import INDEX_TYPE, OFFSET_TYPE
+from search import Workspace, unwind_path
+
+# Level-synchronous BFS whose large levels are expanded by a process pool.
+#
+# The CSR adjacency arrays, the current frontier and one-byte-per-entry
+# visited and seen-movie maps live in shared memory blocks. The parent
+# writes each level's frontier and visited state; workers scan disjoint
+# slices of the frontier and send back (star, parent, movie) candidates
+# not yet visited; the parent merges them into the parent arrays. Levels
+# smaller than `threshold` people are expanded in the parent, which is
+# faster than a round trip to the pool.
+
+# Shared arrays: name -> typecode
+SHARED = (
+    ("person_offsets", OFFSET_TYPE),
+    ("person_movies", INDEX_TYPE),
+    ("movie_offsets", OFFSET_TYPE),
+    ("movie_stars", INDEX_TYPE),
+    ("frontier", INDEX_TYPE),
+    ("visited", "B"),
+    ("seen_movies", "B"),
+)
+
+# Per-worker state, set by _attach()
+_views = None
+_blocks = None
+_found = None
+_opened = None
+
+
+class ParallelSearch():
+    """
+    Shortest paths on a CompactGraph, expanding large levels across
+    `workers` processes (default: one per CPU). Holds a process pool and
+    shared memory until close(); usable as a context manager.
+    """
+
+    # Levels with fewer people than this are expanded serially
+    threshold = 2000
+
+    # Frontier slices per worker and level, to even out uneven degrees
+    chunks_per_worker = 4
+
+    def __init__(self, graph, workers=None, threshold=None):
+        self.graph = graph
+        self.workers = os.cpu_count() if workers is None else workers
+        if threshold is not None:
+            self.threshold = threshold
+        self.blocks = {}
+        self.views = {}
+        self.pool = None
+        self.version = None
+        self._share()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def _share(self):
+        """
+        Copies the graph's adjacency into fresh shared memory blocks
+        and starts the pool. Incremental updates are folded in first,
+        since workers only see the CSR arrays; a CompressedGraph is
+        decoded into them in full.
+        """
+        self.close()
+        graph = self.graph
+        person_offsets, person_movies, movie_offsets, movie_stars = graph.csr()
+        sources = {
+            "person_offsets": person_offsets,
+            "person_movies": person_movies,
+            "movie_offsets": movie_offsets,
+            "movie_stars": movie_stars,
+            "frontier": array(INDEX_TYPE, [0]) * graph.num_people,
+            "visited": bytes(graph.num_people),
+            "seen_movies": bytes(graph.num_movies),
+        }
+        for name, typecode in SHARED:
+            data = memoryview(sources[name]).cast("B")
+            block = SharedMemory(create=True, size=max(len(data), 1))
+            block.buf[:len(data)] = data
+            self.blocks[name] = block
+            self.views[name] = block.buf[:len(data)].cast(typecode)
+        self.version = graph.version
+
+        if self.workers > 1:
+            context = pool_context()
+            layout = [(name, typecode, self.blocks[name].name, len(self.views[name]))
+                      for name, typecode in SHARED]
+            self.pool = context.Pool(self.workers, initializer=_attach,
+                                     initargs=(layout, graph.num_people, graph.num_movies,
+                                               context.get_start_method() != "fork"))
+
+    def shortest_path(self, source, target, workspace=None, probe=None):
+        """
+        Breadth-first search from person index `source` to `target`.
+        Returns a list of (movie index, person index) pairs, or None.
+        """
+        if self.graph.version != self.version:
+            self._share()
+        space = Workspace.for_graph(self.graph) if workspace is None else workspace
+        if probe is not None:
+            probe.start("parallel", self.graph, source, target)
+        path = None
+        try:
+            path = self._search(source, target, space, probe)
+            return path
+        finally:
+            self._reset(space)
+            space.reset()
+            if probe is not None:
+                probe.finish(path)
+
+    def _search(self, source, target, space, probe):
+        if source == target:
+            return []
+        views = self.views
+        person_offsets, person_movies = views["person_offsets"], views["person_movies"]
+        movie_offsets, movie_stars = views["movie_offsets"], views["movie_stars"]
+        shared_frontier, visited, seen_movies = views["frontier"], views["visited"], views["seen_movies"]
+        parent_person, parent_movie, depths = space.parent_person, space.parent_movie, space.depth
+        people, movies = space.people, space.movies
+
+        depths[source] = 0
+        visited[source] = 1
+        people.append(source)
+        frontier = array(INDEX_TYPE, [source])
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = array(INDEX_TYPE)
+            # Star entries read this level, for the probe
+            scanned = 0
+
+            if self.pool is None or len(frontier) < self.threshold:
+                # Small level: expand it here, like search.batched_path
+                for person in frontier:
+                    for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                        if seen_movies[movie]:
+                            continue
+                        seen_movies[movie] = 1
+                        movies.append(movie)
+                        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+                        scanned += end - start
+                        for star in movie_stars[start:end]:
+                            if visited[star]:
+                                continue
+                            visited[star] = 1
+                            depths[star] = depth
+                            parent_person[star] = person
+                            parent_movie[star] = movie
+                            people.append(star)
+                            next_frontier.append(star)
+                            if star == target:
+                                if probe is not None:
+                                    probe.level("forward", depth, frontier, len(next_frontier), scanned)
+                                return unwind_path(parent_person, parent_movie, target)
+            else:
+                shared_frontier[:len(frontier)] = frontier
+                tasks = _slices(len(frontier), target, self.workers * self.chunks_per_worker)
+                for result in self.pool.map(_expand, tasks):
+                    stars, parents, via, scanned_movies = [_unpack(data) for data in result]
+                    if probe is not None:
+                        # Every slice reads the whole list of each movie it scans
+                        scanned += sum(movie_offsets[movie + 1] - movie_offsets[movie]
+                                       for movie in scanned_movies)
+                    for movie in scanned_movies:
+                        if not seen_movies[movie]:
+                            seen_movies[movie] = 1
+                            movies.append(movie)
+                    # Slices are merged in frontier order, so the first
+                    # candidate for a star is the one a serial scan keeps
+                    for star, person, movie in zip(stars, parents, via):
+                        if visited[star]:
+                            continue
+                        visited[star] = 1
+                        depths[star] = depth
+                        parent_person[star] = person
+                        parent_movie[star] = movie
+                        people.append(star)
+                        next_frontier.append(star)
+
+            if probe is not None:
+                probe.level("forward", depth, frontier, len(next_frontier), scanned)
+            if visited[target]:
+                return unwind_path(parent_person, parent_movie, target)
+            frontier = next_frontier
+
+        return None
+
+    def _reset(self, space):
+        """
+        Clears the shared visited and seen-movie entries the search set,
+        using the workspace's logs of them.
+        """
+        visited, seen_movies = self.views["visited"], self.views["seen_movies"]
+        if len(space.people) > len(visited) // 8:
+            visited[:] = bytes(len(visited))
+        else:
+            for person in space.people:
+                visited[person] = 0
+        if len(space.movies) > len(seen_movies) // 8:
+            seen_movies[:] = bytes(len(seen_movies))
+        else:
+            for movie in space.movies:
+                seen_movies[movie] = 0
+
+
+def pool_context():
+    """
+    The multiprocessing context for worker pools: fork where available,
+    so workers inherit data the parent loaded copy-on-write.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+def _attach(layout, num_people, num_movies, untrack):
+    """
+    Pool initializer: maps the shared blocks into this worker.
+    """
+    global _views, _blocks, _found, _opened
+    _views = {}
+    _blocks = []
+    for name, typecode, block_name, length in layout:
+        block = SharedMemory(name=block_name)
+        if untrack:
+            # The parent owns and unlinks the blocks
+            resource_tracker.unregister(block._name, "shared_memory")
+        _blocks.append(block)
+        _views[name] = block.buf[:length * array(typecode).itemsize].cast(typecode)
+    _found = bytearray(num_people)
+    _opened = bytearray(num_movies)
+
+
+def _expand(task):
+    lo, hi, target = task
+    result = _scan(_views, _views["frontier"], lo, hi, target, _found, _opened)
+    return [values.tobytes() for values in result]
+
+
+def _scan(views, frontier, lo, hi, target, found, opened):
+    """
+    Expands frontier[lo:hi] in a worker, stopping early if it reaches
+    `target`. Returns the candidates (stars not visited before this
+    level, each once, with the person and movie that reached it) and
+    the movies scanned, as index arrays.
+    `found` and `opened` are zeroed scratch maps over people and movies,
+    left zeroed again.
+    """
+    person_offsets, person_movies = views["person_offsets"], views["person_movies"]
+    movie_offsets, movie_stars = views["movie_offsets"], views["movie_stars"]
+    visited, seen_movies = views["visited"], views["seen_movies"]
+
+    stars = array(INDEX_TYPE)
+    parents = array(INDEX_TYPE)
+    via = array(INDEX_TYPE)
+    scanned = array(INDEX_TYPE)
+    for i in range(lo, hi):
+        person = frontier[i]
+        for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+            if seen_movies[movie] or opened[movie]:
+                continue
+            opened[movie] = 1
+            scanned.append(movie)
+            for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                if visited[star] or found[star]:
+                    continue
+                found[star] = 1
+                stars.append(star)
+                parents.append(person)
+                via.append(movie)
+                if star == target:
+                    return _clear((stars, parents, via, scanned), found, opened)
+    return _clear((stars, parents, via, scanned), found, opened)
+
+
+def _clear(result, found, opened):
+    stars, _, _, scanned = result
+    for star in stars:
+        found[star] = 0
+    for movie in scanned:
+        opened[movie] = 0
+    return result
+
+
+def _unpack(data):
+    values = array(INDEX_TYPE)
+    values.frombytes(data)
+    return values
+
+
+def _slices(length, target, count):
+    step = -(-length // count)
+    return [(lo, min(lo + step, length), target) for lo in range(0, length, step)]
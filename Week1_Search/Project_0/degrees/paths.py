@@ -0,0 +1,209 @@
+from heapq import heappop, heappush
+
+from search import Workspace, expand_levels
+
+# Enumerating many paths between two people.
+#
+# shortest_path_dag() runs one BFS and keeps, for every person on some
+# shortest path, the (movie, person) edges one level closer to the
+# source. Every shortest path is a walk back through those edges, so
+# the DAG is small even when the number of paths is huge: paths are
+# generated one at a time and counted without being listed.
+#
+# k_shortest_paths() is Yen's algorithm on top, for when the caller
+# wants more chains than there are shortest ones.
+#
+# Paths are lists of (movie index, person index) pairs, as from the
+# search engines. For constrained queries, pass a filters.FilteredGraph.
+
+
+class PathDag():
+    """
+    All shortest paths from `source` to `target`, as predecessor edges.
+    `length` is the degrees of separation, None if not connected.
+    """
+
+    def __init__(self, source, target, length, predecessors, layers):
+        self.source = source
+        self.target = target
+        self.length = length
+        # person -> [(movie, person one step closer to source)]
+        self.predecessors = predecessors
+        # People on shortest paths by distance from source, source first
+        self.layers = layers
+
+    def paths(self):
+        """
+        Yields every shortest path, lazily, in a fixed order.
+        """
+        if self.length is None:
+            return
+        if self.length == 0:
+            yield []
+            return
+        predecessors = self.predecessors
+        # Depth-first walk back from the target; `chosen` holds the
+        # (movie, person) steps taken so far, target side first
+        chosen = []
+        stack = [(self.target, iter(predecessors[self.target]))]
+        while stack:
+            person, edges = stack[-1]
+            edge = next(edges, None)
+            if edge is None:
+                stack.pop()
+                if chosen:
+                    chosen.pop()
+                continue
+            movie, previous = edge
+            chosen.append((movie, person))
+            if previous == self.source:
+                yield chosen[::-1]
+                chosen.pop()
+            else:
+                stack.append((previous, iter(predecessors[previous])))
+
+    def count(self):
+        """
+        Number of distinct shortest paths, without listing them.
+        """
+        if self.length is None:
+            return 0
+        ways = {self.source: 1}
+        for layer in self.layers[1:]:
+            for person in layer:
+                ways[person] = sum(ways[previous] for _, previous in self.predecessors[person])
+        return ways[self.target]
+
+
+def shortest_path_dag(graph, source, target, workspace=None):
+    """
+    Returns the PathDag of every shortest path between two person indices.
+    """
+    if source == target:
+        return PathDag(source, target, 0, {}, [[source]])
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    try:
+        return _build_dag(graph, source, target, space)
+    finally:
+        space.reset()
+
+
+def _build_dag(graph, source, target, space):
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    depth = space.depth
+
+    # Forward BFS until the target is reached: every level before
+    # the target's is then complete, which is all the DAG needs
+    for _ in expand_levels(graph, space, [source], stop=target.__eq__):
+        pass
+    if depth[target] == -1:
+        return PathDag(source, target, None, {}, [])
+
+    # Backward from the target, keep edges that step down one level
+    predecessors = {}
+    layers = [[target]]
+    for level in range(depth[target], 0, -1):
+        next_layer = []
+        added = set()
+        for person in layers[-1]:
+            edges = []
+            for movie in movies_of(person):
+                for star in stars_of(movie):
+                    if depth[star] == level - 1:
+                        edges.append((movie, star))
+                        if star not in added:
+                            added.add(star)
+                            next_layer.append(star)
+            predecessors[person] = edges
+        for person in next_layer:
+            predecessors.setdefault(person, [])
+        layers.append(next_layer)
+    layers.reverse()
+    return PathDag(source, target, depth[target], predecessors, layers)
+
+
+def all_shortest_paths(graph, source, target):
+    """
+    Yields every shortest path between two person indices, lazily.
+    """
+    return shortest_path_dag(graph, source, target).paths()
+
+
+def k_shortest_paths(graph, source, target, k=10):
+    """
+    Yields up to `k` loopless paths in order of length (Yen's algorithm).
+    Paths of equal length may come in any order.
+    """
+    first = _spur_path(graph, source, target, set(), set())
+    if first is None:
+        return
+    accepted = [first]
+    yield first
+    candidates = []
+    seen = {tuple(first)}
+    pushed = 0
+    while len(accepted) < k:
+        last = accepted[-1]
+        people = [source] + [person for _, person in last]
+        for j in range(len(last)):
+            spur = people[j]
+            root = last[:j]
+            # Edges out of the spur that accepted paths with this root
+            # already take, and the root's people, are off limits
+            banned_edges = {path[j] for path in accepted if len(path) > j and path[:j] == root}
+            spur_path = _spur_path(graph, spur, target, set(people[:j]), banned_edges)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            key = tuple(candidate)
+            if key not in seen:
+                seen.add(key)
+                heappush(candidates, (len(candidate), pushed, candidate))
+                pushed += 1
+        if not candidates:
+            return
+        path = heappop(candidates)[2]
+        accepted.append(path)
+        yield path
+
+
+def _spur_path(graph, source, target, banned_people, banned_edges):
+    """
+    BFS shortest path avoiding `banned_people` and, out of `source`,
+    the (movie, person) steps in `banned_edges`.
+    """
+    if source == target:
+        return []
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    parents = {source: None}
+    # Movies already scanned from someone other than the source. The
+    # source's own movies stay open: its banned steps skip some stars,
+    # which may still be reached through the same movie later.
+    seen_movies = set()
+    frontier = [source]
+    while frontier:
+        next_frontier = []
+        for person in frontier:
+            for movie in movies_of(person):
+                if movie in seen_movies:
+                    continue
+                if person != source:
+                    seen_movies.add(movie)
+                for star in stars_of(movie):
+                    if star in parents or star in banned_people:
+                        continue
+                    if person == source and (movie, star) in banned_edges:
+                        continue
+                    parents[star] = (person, movie)
+                    if star == target:
+                        path = []
+                        while parents[star] is not None:
+                            person, movie = parents[star]
+                            path.append((movie, star))
+                            star = person
+                        path.reverse()
+                        return path
+                    next_frontier.append(star)
+        frontier = next_frontier
+    return None
+
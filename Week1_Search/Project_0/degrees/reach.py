@@ -0,0 +1,93 @@
+from search import Workspace, expand_levels, unwind_path
+
+# One-to-many and many-to-many queries: "which of these people are within
+# 3 degrees of X?" answered with one bounded breadth-first traversal
+# instead of a shortest_path call per target.
+#
+# The traversal starts from every source at once, stops as soon as each
+# target has been reached or `max_depth` levels have been expanded, and
+# answers from the workspace's depth and parent arrays. Targets that
+# are not in the result were not reached within the cap.
+#
+# Takes and returns dense person indices, like the search engines;
+# degrees.people_within works on IMDB ids.
+
+
+def distances_to(graph, source, targets, max_depth=None, workspace=None):
+    """
+    Returns {target: degrees of separation from `source`} for the
+    `targets` within `max_depth` degrees (any distance if None).
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    try:
+        reached = _bounded(graph, [source], set(targets), max_depth, space)
+        return {target: space.depth[target] for target in reached}
+    finally:
+        space.reset()
+
+
+def paths_to(graph, source, targets, max_depth=None, workspace=None):
+    """
+    Like distances_to, but maps each reached target to a shortest path,
+    a list of (movie index, person index) pairs.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    try:
+        reached = _bounded(graph, [source], set(targets), max_depth, space)
+        return {target: unwind_path(space.parent_person, space.parent_movie, target)
+                for target in reached}
+    finally:
+        space.reset()
+
+
+def nearest_sources(graph, sources, targets, max_depth=None, workspace=None):
+    """
+    Many-to-many in one traversal: maps each target reached within
+    `max_depth` degrees of any of `sources` to (nearest source, path).
+    Ties between equally near sources go to whichever is found first.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    try:
+        reached = _bounded(graph, sources, set(targets), max_depth, space)
+        parent_person, parent_movie = space.parent_person, space.parent_movie
+        return {target: (_root(parent_person, target), unwind_path(parent_person, parent_movie, target))
+                for target in reached}
+    finally:
+        space.reset()
+
+
+def distance_matrix(graph, sources, targets, max_depth=None, workspace=None):
+    """
+    Returns {source: {target: degrees}} for every pair within `max_depth`,
+    with one bounded traversal per source sharing a workspace.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    return {source: distances_to(graph, source, targets, max_depth, space) for source in sources}
+
+
+def _bounded(graph, sources, remaining, max_depth, space):
+    """
+    Breadth-first expansion from `sources` that stops once `remaining`
+    is empty or after `max_depth` levels. Returns the targets reached;
+    depths and parents are left in `space` for the caller.
+    """
+    reached = [source for source in dict.fromkeys(sources) if source in remaining]
+    remaining.difference_update(reached)
+
+    def reach(person):
+        if person in remaining:
+            remaining.discard(person)
+            reached.append(person)
+            return not remaining
+        return False
+
+    # With every target among the sources, only the sources are marked
+    for _ in expand_levels(graph, space, sources, max_depth if remaining else 0, stop=reach):
+        pass
+    return reached
+
+
+def _root(parent_person, person):
+    while parent_person[person] != -1:
+        person = parent_person[person]
+    return person
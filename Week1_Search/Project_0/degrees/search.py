@@ -0,0 +1,530 @@
+from array import array
+
+from graph import INDEX_TYPE
+
+# Search engines that run on a graph.CompactGraph.
+# They take and return dense person/movie indices;
+# path_to_ids converts a result to IMDB ids for degrees.py.
+#
+# Engines record predecessors in a Workspace's parent arrays instead of
+# allocating a node per visited person, and rebuild the path once at the end.
+# Each also takes an optional instrument.Probe, told about every level.
+# expand_levels is the plain level-by-level expansion that batched_path,
+# the sweeps and the bounded searches in other modules share.
+
+
+class Workspace():
+    """
+    Scratch arrays for one search at a time, indexed by dense person and
+    movie index. Engines log every entry they set and reset only those,
+    so one Workspace can be reused for any number of searches.
+    """
+
+    def __init__(self, num_people, num_movies):
+        self.parent_person = array(INDEX_TYPE, [-1]) * num_people
+        self.parent_movie = array(INDEX_TYPE, [-1]) * num_people
+        # -1 marks an unvisited person
+        self.depth = array(INDEX_TYPE, [-1]) * num_people
+        self.seen_movies = bytearray(num_movies)
+        # Visited people in discovery order (BFS order) and visited movies
+        self.people = []
+        self.movies = []
+        self._companion = None
+
+    @classmethod
+    def for_graph(cls, graph):
+        return cls(graph.num_people, graph.num_movies)
+
+    def companion(self):
+        """
+        A second workspace of the same size, for searches from both ends.
+        """
+        if self._companion is None:
+            self._companion = Workspace(len(self.depth), len(self.seen_movies))
+        return self._companion
+
+    def reset(self):
+        # After a search that touched a large share of the graph,
+        # refilling whole arrays in C beats undoing entries one by one.
+        num_people = len(self.depth)
+        if len(self.people) > num_people // 8:
+            self.parent_person = array(INDEX_TYPE, [-1]) * num_people
+            self.parent_movie = array(INDEX_TYPE, [-1]) * num_people
+            self.depth = array(INDEX_TYPE, [-1]) * num_people
+        else:
+            for person in self.people:
+                self.parent_person[person] = -1
+                self.parent_movie[person] = -1
+                self.depth[person] = -1
+        if len(self.movies) > len(self.seen_movies) // 8:
+            self.seen_movies = bytearray(len(self.seen_movies))
+        else:
+            for movie in self.movies:
+                self.seen_movies[movie] = 0
+        self.people.clear()
+        self.movies.clear()
+
+
+def shortest_path(graph, source, target, workspace=None, probe=None):
+    """
+    Breadth-first search from person index `source` to `target`.
+    Returns a list of (movie index, person index) pairs, or None.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    if probe is not None:
+        probe.start("bfs", graph, source, target)
+    path = None
+    try:
+        path = _breadth_first(graph, source, target, space, probe)
+        return path
+    finally:
+        space.reset()
+        if probe is not None:
+            probe.finish(path)
+
+
+def _breadth_first(graph, source, target, space, probe):
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    parent_person, parent_movie, depth = space.parent_person, space.parent_movie, space.depth
+    seen_movies, visited_movies = space.seen_movies, space.movies
+
+    # The visited log doubles as the queue: BFS visits in discovery order
+    queue = space.people
+    depth[source] = 0
+    queue.append(source)
+    head = 0
+    # Start and end of the level being expanded, and the star entries
+    # it scanned, for the probe
+    mark, level_end = 0, 1
+    scanned = 0
+
+    while head < len(queue):
+        person = queue[head]
+        if probe is not None and depth[person] != depth[queue[mark]]:
+            # Everyone one level deeper is queued by now
+            probe.level("forward", depth[person], queue[mark:head], len(queue) - head, scanned)
+            mark, level_end = head, len(queue)
+            scanned = 0
+        head += 1
+
+        if person == target:
+            if probe is not None and head - 1 > mark:
+                probe.level("forward", depth[person] + 1, queue[mark:head - 1], len(queue) - level_end,
+                            scanned)
+            return unwind_path(parent_person, parent_movie, target)
+
+        level = depth[person] + 1
+        # Movies are vertices too: each one's stars are queued the first
+        # time any of them is expanded, and never scanned again
+        for movie in movies_of(person):
+            if seen_movies[movie]:
+                continue
+            seen_movies[movie] = 1
+            visited_movies.append(movie)
+            stars = stars_of(movie)
+            scanned += len(stars)
+            for star in stars:
+                if depth[star] == -1:
+                    depth[star] = level
+                    parent_person[star] = person
+                    parent_movie[star] = movie
+                    queue.append(star)
+
+    if probe is not None:
+        probe.level("forward", depth[queue[mark]] + 1, queue[mark:], 0, scanned)
+    return None
+
+
+def bidirectional_path(graph, source, target, workspace=None, probe=None):
+    """
+    Level-synchronous bidirectional breadth-first search.
+
+    Each round expands one whole level, from whichever side has the
+    smaller frontier. The first level that reaches a person already
+    discovered by the other side contains a meeting point of a shortest
+    path; the best meeting point in that level is used.
+    Returns a list of (movie index, person index) pairs, or None.
+    """
+    forward = Workspace.for_graph(graph) if workspace is None else workspace
+    backward = forward.companion()
+    if probe is not None:
+        probe.start("bidirectional", graph, source, target)
+    path = None
+    try:
+        path = _bidirectional(graph, source, target, forward, backward, probe)
+        return path
+    finally:
+        forward.reset()
+        backward.reset()
+        if probe is not None:
+            probe.finish(path)
+
+
+def _bidirectional(graph, source, target, forward_space, backward_space, probe):
+    if source == target:
+        return []
+
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    forward_space.depth[source] = 0
+    forward_space.people.append(source)
+    backward_space.depth[target] = 0
+    backward_space.people.append(target)
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        forward = len(forward_frontier) <= len(backward_frontier)
+        if forward:
+            frontier, space, other = forward_frontier, forward_space, backward_space
+        else:
+            frontier, space, other = backward_frontier, backward_space, forward_space
+        parent_person, parent_movie, depth = space.parent_person, space.parent_movie, space.depth
+        seen_movies, visited_movies = space.seen_movies, space.movies
+        other_depth = other.depth
+        visited = space.people
+
+        next_frontier = []
+        meeting = None
+        scanned = 0
+        for person in frontier:
+            level = depth[person] + 1
+            for movie in movies_of(person):
+                # Each side scans a movie's stars once
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                visited_movies.append(movie)
+                stars = stars_of(movie)
+                scanned += len(stars)
+                for star in stars:
+                    if depth[star] != -1:
+                        continue
+                    depth[star] = level
+                    parent_person[star] = person
+                    parent_movie[star] = movie
+                    visited.append(star)
+                    next_frontier.append(star)
+                    if other_depth[star] != -1 and (
+                        meeting is None or other_depth[star] < other_depth[meeting]
+                    ):
+                        meeting = star
+
+        if probe is not None:
+            probe.level("forward" if forward else "backward", level, frontier, len(next_frontier), scanned)
+        if meeting is not None:
+            if probe is not None:
+                probe.meet(meeting, forward_space.depth[meeting], backward_space.depth[meeting])
+            return _join_paths(forward_space, backward_space, meeting)
+
+        if forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def batched_path(graph, source, target, workspace=None, probe=None):
+    """
+    Breadth-first search that expands a whole level per step:
+    frontier people -> their movies -> those movies' stars.
+
+    Each movie's star list is scanned at most once per search.
+    Returns a list of (movie index, person index) pairs, or None.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    if probe is not None:
+        probe.start("batched", graph, source, target)
+    path = None
+    try:
+        path = _batched(graph, source, target, space, probe)
+        return path
+    finally:
+        space.reset()
+        if probe is not None:
+            probe.finish(path)
+
+
+def _batched(graph, source, target, space, probe):
+    if source == target:
+        return []
+
+    for level, frontier, discovered, scanned in expand_levels(graph, space, [source], stop=target.__eq__):
+        if probe is not None:
+            probe.level("forward", level, frontier, discovered, scanned)
+    if space.depth[target] == -1:
+        return None
+    return unwind_path(space.parent_person, space.parent_movie, target)
+
+
+def direction_optimizing_path(graph, source, target, workspace=None, probe=None):
+    """
+    Breadth-first search that chooses, per level and per half-step,
+    between top-down and bottom-up expansion.
+
+    A level goes from the frontier people to the movies they open, then
+    from those movies to unvisited people. Top-down, each frontier
+    person's movies (then each opened movie's stars) are scanned. When
+    the frontier is a large share of what is left, bottom-up is cheaper:
+    every unseen movie looks for a star in the frontier (then every
+    unvisited person for an opened movie) and stops at the first one.
+    The target is checked against the opened movies before the second
+    half-step, so the last level is never expanded.
+    Returns a list of (movie index, person index) pairs, or None.
+    """
+    space = Workspace.for_graph(graph) if workspace is None else workspace
+    if probe is not None:
+        probe.start("direction", graph, source, target)
+    path = None
+    try:
+        path = _direction_optimizing(graph, source, target, space, probe)
+        return path
+    finally:
+        space.reset()
+        if probe is not None:
+            probe.finish(path)
+
+
+# A half-step goes bottom-up once the share of people (or movies) on
+# its frontier, times this, exceeds the share of movies (or people) it
+# could still reach; tuned on synthetic.py graphs
+BOTTOM_UP_FACTOR = 1
+
+
+def _direction_optimizing(graph, source, target, space, probe):
+    if source == target:
+        return []
+
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    parent_person, parent_movie, depth = space.parent_person, space.parent_movie, space.depth
+    seen_movies = space.seen_movies
+    visited, visited_movies = space.people, space.movies
+    num_people, num_movies = graph.num_people, graph.num_movies
+
+    depth[source] = 0
+    visited.append(source)
+    frontier = [source]
+    # People and movies not yet visited, built for the first bottom-up step
+    unvisited = None
+    unseen = None
+    level = 0
+    while frontier:
+        level += 1
+        # Neighbor list entries read this level, bottom-up lists included
+        scanned = 0
+
+        # Bottom-up for the target alone: is one of its unseen movies
+        # shared with someone on the frontier? Then this is the last level.
+        for movie in movies_of(target):
+            if seen_movies[movie]:
+                continue
+            stars = stars_of(movie)
+            scanned += len(stars)
+            for star in stars:
+                if depth[star] == level - 1:
+                    depth[target] = level
+                    parent_person[target] = star
+                    parent_movie[target] = movie
+                    visited.append(target)
+                    if probe is not None:
+                        probe.level("forward", level, frontier, 1, scanned)
+                    return unwind_path(parent_person, parent_movie, target)
+
+        # Half-step 1: the movies the frontier opens, each with the
+        # frontier person it was opened from
+        opened = {}
+        unseen_count = num_movies - len(visited_movies)
+        if len(frontier) * num_movies * BOTTOM_UP_FACTOR > unseen_count * num_people:
+            if unseen is None:
+                unseen = [movie for movie in range(num_movies) if not seen_movies[movie]]
+            still_unseen = []
+            for movie in unseen:
+                if seen_movies[movie]:
+                    continue
+                stars = stars_of(movie)
+                scanned += len(stars)
+                for star in stars:
+                    if depth[star] == level - 1:
+                        seen_movies[movie] = 1
+                        visited_movies.append(movie)
+                        opened[movie] = star
+                        break
+                else:
+                    still_unseen.append(movie)
+            unseen = still_unseen
+        else:
+            for person in frontier:
+                for movie in movies_of(person):
+                    if not seen_movies[movie]:
+                        seen_movies[movie] = 1
+                        visited_movies.append(movie)
+                        opened[movie] = person
+
+        # Half-step 2: the people those movies reach
+        next_frontier = []
+        unvisited_count = num_people - len(visited)
+        if len(opened) * num_people * BOTTOM_UP_FACTOR > unvisited_count * num_movies:
+            if unvisited is None:
+                unvisited = [person for person in range(num_people) if depth[person] == -1]
+            still_unvisited = []
+            for person in unvisited:
+                if depth[person] != -1:
+                    continue
+                movies = movies_of(person)
+                scanned += len(movies)
+                for movie in movies:
+                    parent = opened.get(movie)
+                    if parent is not None:
+                        depth[person] = level
+                        parent_person[person] = parent
+                        parent_movie[person] = movie
+                        visited.append(person)
+                        next_frontier.append(person)
+                        break
+                else:
+                    still_unvisited.append(person)
+            unvisited = still_unvisited
+        else:
+            for movie, person in opened.items():
+                stars = stars_of(movie)
+                scanned += len(stars)
+                for star in stars:
+                    if depth[star] != -1:
+                        continue
+                    depth[star] = level
+                    parent_person[star] = person
+                    parent_movie[star] = movie
+                    visited.append(star)
+                    next_frontier.append(star)
+        if probe is not None:
+            probe.level("forward", level, frontier, len(next_frontier), scanned)
+        frontier = next_frontier
+
+    return None
+
+
+def distances_from(graph, source, typecode="b", widen=False):
+    """
+    Breadth-first sweep from person index `source` to every person.
+    Returns an array of degrees of separation, -1 where unreachable.
+    The default int8 typecode raises OverflowError past 127 degrees,
+    unless `widen` is set: then int16 is returned instead.
+    """
+    return distances_from_any(graph, [source], typecode, widen)
+
+
+def distances_from_any(graph, sources, typecode="b", widen=False):
+    """
+    Multi-source sweep: degrees of separation from every person to the
+    nearest of the person indices in `sources`, in one pass.
+    """
+    space = Workspace.for_graph(graph)
+    for _ in expand_levels(graph, space, sources):
+        pass
+    try:
+        return array(typecode, space.depth)
+    except OverflowError:
+        if not widen:
+            raise
+        return array("h", space.depth)
+
+
+def expand_levels(graph, space, sources, max_depth=None, stop=None, prune=None):
+    """
+    Level-synchronous breadth-first expansion from the person indices
+    `sources`, one level per step: frontier people -> their unseen
+    movies -> those movies' unvisited stars. Depths, parents and seen
+    movies go into `space`, logged for its reset(), which is left to
+    the caller along with reading the results.
+
+    Yields (depth, expanded, discovered, scanned) after each level, as
+    Probe.level takes them. Ends when the frontier runs out, after
+    `max_depth` levels, or as soon as stop(person) is true for a newly
+    reached person; the level that cuts short is still yielded.
+    Reached people for whom prune(person, depth) is true are kept off
+    the next frontier.
+    """
+    movies_of, stars_of = graph.movies_of, graph.stars_of
+    parent_person, parent_movie, depth = space.parent_person, space.parent_movie, space.depth
+    seen_movies, visited, visited_movies = space.seen_movies, space.people, space.movies
+
+    frontier = []
+    for source in sources:
+        if depth[source] == -1:
+            depth[source] = 0
+            visited.append(source)
+            frontier.append(source)
+
+    level = 0
+    while frontier and (max_depth is None or level < max_depth):
+        level += 1
+        next_frontier = []
+        scanned = 0
+        for person in frontier:
+            for movie in movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                visited_movies.append(movie)
+                stars = stars_of(movie)
+                scanned += len(stars)
+                for star in stars:
+                    if depth[star] != -1:
+                        continue
+                    depth[star] = level
+                    parent_person[star] = person
+                    parent_movie[star] = movie
+                    visited.append(star)
+                    if stop is not None and stop(star):
+                        yield level, frontier, len(next_frontier) + 1, scanned
+                        return
+                    if prune is None or not prune(star, level):
+                        next_frontier.append(star)
+        yield level, frontier, len(next_frontier), scanned
+        frontier = next_frontier
+
+
+def unwind_path(parent_person, parent_movie, target):
+    """
+    Rebuilds the path to `target` from parent arrays (-1 marks the root).
+    """
+    path = []
+    person = target
+    while parent_person[person] != -1:
+        path.append((parent_movie[person], person))
+        person = parent_person[person]
+    path.reverse()
+    return path
+
+
+def _join_paths(forward_space, backward_space, meeting):
+    """
+    Stitches the source -> meeting and meeting -> target halves together.
+    """
+    path = unwind_path(forward_space.parent_person, forward_space.parent_movie, meeting)
+    person = meeting
+    parent_person, parent_movie = backward_space.parent_person, backward_space.parent_movie
+    while parent_person[person] != -1:
+        path.append((parent_movie[person], parent_person[person]))
+        person = parent_person[person]
+    return path
+
+
+# Engines selectable from degrees.py; each takes
+# (graph, source, target, workspace=None, probe=None)
+ENGINES = {
+    "bfs": shortest_path,
+    "bidirectional": bidirectional_path,
+    "batched": batched_path,
+    "direction": direction_optimizing_path,
+}
+
+
+def path_to_ids(graph, path):
+    """
+    Converts a path of (movie index, person index) pairs
+    to (movie_id, person_id) pairs.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
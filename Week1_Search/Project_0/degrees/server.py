@@ -0,0 +1,375 @@
+import asyncio
+import concurrent.futures
+import json
+import signal
+import socket
+import sys
+
+import degrees
+from cache import MISS, PathCache
+from parallel import pool_context
+
+# Long-running query server: the graph is loaded (or mapped from a
+# snapshot) once and queries arrive as JSON lines over TCP or a Unix
+# socket. Each request line gets exactly one response line:
+#
+#   {"op": "resolve", "name": "Kevin Bacon"}
+#       -> {"people": [{"id", "name", "birth", "movies"}, ...]}
+#   {"op": "candidates", "text": "kevn bacn", "limit": 5}
+#       -> {"people": [...]}                   exact, prefix, then fuzzy
+#   {"op": "path", "source": NAME, "target": NAME}
+#       -> {"degrees": 2, "path": [[movie_id, person_id], ...]}
+#   {"op": "paths", "source": NAME, "target": NAME, "limit": 10}
+#       -> {"paths": [[[movie_id, person_id], ...], ...]}
+#   {"op": "within", "source": NAME, "targets": [ID, ...], "max_depth": 3}
+#       -> {"found": {ID: degrees, ...}}       "paths": true for paths
+#   {"op": "stats"}
+#       -> request, timeout and busy counters and cache stats
+#
+# "source_id"/"target_id" may replace the names. "path" and "paths" take
+# optional "years": [first, last], "avoid_movies" and "avoid_people".
+# An "id" in a request is echoed back; failures carry an "error" string.
+#
+# Name lookups run on the event loop. Searches run in a process pool
+# forked after loading, so they share the graph copy-on-write and never
+# stall the loop. A search is given `timeout` seconds before its client
+# gets an error; the worker still finishes it, so searches in flight
+# (counted until they really end) are capped, and requests past the cap
+# are refused as busy instead of queueing.
+#
+# Request lines may be up to LINE_LIMIT bytes; a longer one gets an
+# error reply and its connection is closed, since the rest of the line
+# cannot be told apart from the next request.
+
+# Longest request line accepted, in bytes (asyncio's default is 64 KiB)
+LINE_LIMIT = 16 * 1024 * 1024
+
+
+class Server():
+    """
+    Asyncio JSON-lines server over the data degrees has loaded from
+    `directory`. Searches run on `workers` processes (default: one per
+    CPU; 0 for a thread in this process).
+    """
+
+    def __init__(self, directory, workers=None, timeout=10.0, max_in_flight=64, cache_size=0):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.cache = PathCache(cache_size, graph=degrees.graph) if cache_size > 0 else None
+        self.counters = {"requests": 0, "errors": 0, "timeouts": 0, "busy": 0}
+        if workers == 0:
+            # Searches on a thread; for small data sets and debugging
+            self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        else:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                workers, mp_context=pool_context(),
+                initializer=_init_worker, initargs=(directory,),
+            )
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path, limit=LINE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        where = path or ", ".join(f"{name[0]}:{name[1]}" for name in
+                                   (sock.getsockname() for sock in server.sockets))
+        print(f"Serving on {where}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection. Requests on it are answered concurrently,
+        so responses may come back out of order; use "id" to match them.
+        """
+        pending = set()
+        lock = asyncio.Lock()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Past LINE_LIMIT: answer, then drop the connection
+                    self.counters["requests"] += 1
+                    self.counters["errors"] += 1
+                    await self._send({"error": f"bad request: line longer than {LINE_LIMIT} bytes"},
+                                     writer, lock)
+                    break
+                except ConnectionResetError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._respond(line, writer, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer, lock):
+        await self._send(await self.answer(line), writer, lock)
+
+    async def _send(self, response, writer, lock):
+        async with lock:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def answer(self, line):
+        """
+        Returns the response dict for one request line.
+        """
+        self.counters["requests"] += 1
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            self.counters["errors"] += 1
+            return {"error": f"bad request: {e}"}
+
+        response = {"id": request["id"]} if "id" in request else {}
+        try:
+            response.update(await self._dispatch(request))
+        except QueryError as e:
+            self.counters["errors"] += 1
+            response["error"] = str(e)
+        except Exception as e:
+            # Never drop a reply, even on a bug in a search
+            self.counters["errors"] += 1
+            response["error"] = f"internal error: {type(e).__name__}: {e}"
+        return response
+
+    async def _dispatch(self, request):
+        op = request.get("op")
+        if op == "resolve":
+            return {"people": degrees.name_index.exact(_field(request, "name"))}
+        if op == "candidates":
+            limit = _count(request, "limit", 10)
+            return {"people": degrees.name_index.candidates(_field(request, "text"), limit)}
+        if op == "stats":
+            stats = dict(self.counters, in_flight=self.in_flight)
+            if self.cache is not None:
+                stats["cache"] = self.cache.stats()
+            return stats
+        if op not in ("path", "paths", "within"):
+            raise QueryError(f"unknown op: {op}")
+
+        source = _person(request, "source")
+        if op == "within":
+            targets = _ids(request, "targets", None)
+            found = await self._search(degrees.people_within, source, targets,
+                                       _count(request, "max_depth", None), bool(request.get("paths")))
+            return {"found": found}
+        target = _person(request, "target")
+        constraints = {
+            "years": _years(request),
+            "avoid_movies": tuple(_ids(request, "avoid_movies", ())),
+            "avoid_people": tuple(_ids(request, "avoid_people", ())),
+        }
+        constrained = constraints["years"] is not None or any(constraints.values())
+        if op == "paths":
+            paths = await self._search(_find_paths, source, target, _count(request, "limit", 10), constraints)
+            return {"paths": paths}
+
+        if self.cache is not None and not constrained:
+            path = self.cache.get(source, target)
+            if path is not MISS:
+                return _path_response(path)
+        path = await self._search(_find_path, source, target, constraints)
+        if self.cache is not None and not constrained:
+            self.cache.put(source, target, path)
+        return _path_response(path)
+
+    async def _search(self, function, *args):
+        """
+        Runs function(*args) in the pool, within the in-flight cap and timeout.
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.counters["busy"] += 1
+            raise QueryError("busy: too many searches in flight")
+        self.in_flight += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        future.add_done_callback(self._finished)
+        try:
+            # shield: a timeout abandons the result but the slot stays
+            # taken until the worker is really done
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise QueryError(f"timeout after {self.timeout} seconds")
+
+    def _finished(self, future):
+        self.in_flight -= 1
+        if not future.cancelled():
+            # Retrieve abandoned exceptions so asyncio does not log them
+            future.exception()
+
+
+class QueryError(Exception):
+    """
+    A request that cannot be answered; its message goes to the client.
+    """
+
+
+def _field(request, name):
+    value = request.get(name)
+    if not isinstance(value, str):
+        raise QueryError(f"missing {name}")
+    return value
+
+
+def _count(request, name, default):
+    """
+    Returns request[name], a non-negative integer, or `default` if absent.
+    """
+    value = request.get(name)
+    if value is None:
+        return default
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise QueryError(f"{name} must be a non-negative integer")
+    return value
+
+
+def _ids(request, name, default):
+    """
+    Returns request[name], a list of id strings; `default` if absent,
+    or an error if `default` is None.
+    """
+    value = request.get(name)
+    if value is None:
+        if default is None:
+            raise QueryError(f"missing {name}")
+        return default
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise QueryError(f"{name} must be a list of ids")
+    return value
+
+
+def _years(request):
+    """
+    Returns request["years"] as a (first, last) pair, each an int or
+    None, or None if absent.
+    """
+    years = request.get("years")
+    if years is None:
+        return None
+    if (not isinstance(years, list) or len(years) != 2
+            or not all(year is None or (isinstance(year, int) and not isinstance(year, bool))
+                       for year in years)):
+        raise QueryError("years must be [first, last], each a year or null")
+    return tuple(years)
+
+
+def _person(request, side):
+    """
+    Returns the person id for request["<side>_id"] or request[side],
+    a name that must match exactly one person.
+    """
+    person_id = request.get(f"{side}_id")
+    if person_id is not None:
+        if degrees.graph.person_index(person_id) is None:
+            raise QueryError(f"unknown {side}_id: {person_id}")
+        return person_id
+    name = _field(request, side)
+    matches = degrees.name_index.exact(name)
+    if not matches:
+        raise QueryError(f"person not found: {name}")
+    if len(matches) > 1:
+        ids = ", ".join(match["id"] for match in matches)
+        raise QueryError(f"ambiguous name: {name} (ids {ids})")
+    return matches[0]["id"]
+
+
+def _path_response(path):
+    return {"degrees": None if path is None else len(path), "path": path}
+
+
+def _init_worker(directory):
+    # Forked workers inherit the loaded graph; others load it themselves
+    if degrees.graph is None:
+        degrees.load_data(directory, compact=True)
+
+
+def _find_path(source, target, constraints):
+    if constraints["years"] is None and not constraints["avoid_movies"] and not constraints["avoid_people"]:
+        return degrees.shortest_path(source, target)
+    return degrees.constrained_path(source, target, **constraints)
+
+
+def _find_paths(source, target, limit, constraints):
+    return degrees.shortest_paths(source, target, limit, **constraints)
+
+
+class Client():
+    """
+    Minimal blocking client, one request at a time.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None, timeout=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.sock.settimeout(timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, message):
+        self.file.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"host": "127.0.0.1", "port": 8765, "socket": None, "workers": None,
+               "timeout": 10.0, "max-in-flight": 64, "cache": 0, "landmarks": 0}
+    for arg in list(args):
+        name, _, value = arg[2:].partition("=")
+        if arg.startswith("--") and name in options and value:
+            kind = type(options[name]) if options[name] is not None else str
+            options[name] = int(value) if name == "workers" else kind(value)
+            args.remove(arg)
+    if len(args) != 1:
+        sys.exit("Usage: python server.py [--host=H] [--port=P] [--socket=PATH] [--workers=N]\n"
+                 "                        [--timeout=S] [--max-in-flight=N] [--cache=N] [--landmarks=K]\n"
+                 "                        directory")
+    directory = args[0]
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True, progress=print)
+    if options["landmarks"] > 0:
+        degrees.build_oracle(options["landmarks"])
+    # Exit through the finally below, so pool workers are shut down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = Server(directory, options["workers"], options["timeout"], options["max-in-flight"], options["cache"])
+    try:
+        asyncio.run(server.serve(options["host"], options["port"], options["socket"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from components import Components
+from compressed import CompressedGraph, CompressedLists
+from graph import CompactGraph, INDEX_TYPE, OFFSET_TYPE
+
+# Binary snapshot of a CompactGraph, written next to the CSV files.
+#
+# Layout: MAGIC, a little-endian (version, header length) pair, a JSON
+# header, then every section 8-byte aligned. The header records where each
+# section lives and a fingerprint of the CSV files it was built from.
+# Reading mmaps the file and casts sections in place, so nothing is parsed
+# or copied until a query touches it.
+#
+# A CompressedGraph is written with its encoded neighbor lists in place
+# of the CSR arrays, and read back as one, still decoded on the fly.
+#
+# Incremental updates (CompactGraph.apply deltas) are appended to a JSON
+# lines journal next to the snapshot and replayed on read; write() folds
+# them in and starts a new journal.
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 4
+SNAPSHOT_NAME = "degrees.snapshot"
+JOURNAL_NAME = "degrees.snapshot.journal"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# CSR adjacency, or COMPRESSED for a CompressedGraph
+ADJACENCY = (
+    ("person_offsets", OFFSET_TYPE),
+    ("person_movies", INDEX_TYPE),
+    ("movie_offsets", OFFSET_TYPE),
+    ("movie_stars", INDEX_TYPE),
+)
+COMPRESSED = ("person_lists", "movie_lists")
+ARRAYS = (
+    ("person_order", INDEX_TYPE),
+    ("movie_order", INDEX_TYPE),
+    ("name_order", INDEX_TYPE),
+    ("removed_people", INDEX_TYPE),
+    ("removed_movies", INDEX_TYPE),
+    ("component_labels", INDEX_TYPE),
+)
+STRINGS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+)
+
+_PREAMBLE = struct.Struct("<II")
+
+
+class StringTable():
+    """
+    Sequence of strings stored as UTF-8 bytes plus an offset array.
+    Strings are decoded one at a time, on access. Appended strings
+    (from incremental updates) are kept in a plain list after them.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.extra = []
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.extra)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        if i >= len(self.offsets) - 1:
+            return self.extra[i - len(self.offsets) + 1]
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, value):
+        self.extra.append(value)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def journal_path(directory):
+    return os.path.join(directory, JOURNAL_NAME)
+
+
+def fingerprint(directory, hashes=True):
+    """
+    Returns {csv name: [size, mtime_ns, sha256 or None]} for the source files.
+    """
+    result = {}
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        result[name] = [stat.st_size, stat.st_mtime_ns, _sha256(path) if hashes else None]
+    return result
+
+
+def is_fresh(recorded, directory):
+    """
+    True if the CSV files still match a recorded fingerprint.
+    Files whose mtime moved but whose size and contents did not still count.
+    """
+    current = fingerprint(directory, hashes=False)
+    for name in SOURCES:
+        size, mtime, digest = recorded.get(name, [None, None, None])
+        if current[name][0] != size:
+            return False
+        if current[name][1] != mtime and _sha256(os.path.join(directory, name)) != digest:
+            return False
+    return True
+
+
+def write(graph, directory):
+    """
+    Writes `graph` to the snapshot file for `directory`.
+    The file is replaced atomically, so running readers keep their mapping.
+    """
+    graph.consolidate()
+    if graph.name_order is None:
+        graph.build_orders()
+    if graph.component_labels is None:
+        Components(graph)
+
+    sections = []
+    compressed = None
+    if isinstance(graph, CompressedGraph):
+        compressed = {}
+        for name in COMPRESSED:
+            lists = getattr(graph, name)
+            compressed[name] = [lists.shift, lists.count]
+            sections.append((f"{name}.blocks", OFFSET_TYPE, array(OFFSET_TYPE, lists.blocks).tobytes()))
+            sections.append((f"{name}.relative", "H", array("H", lists.relative).tobytes()))
+            sections.append((f"{name}.data", "B", bytes(lists.data)))
+    arrays = ARRAYS if compressed is not None else ADJACENCY + ARRAYS
+    for name, typecode in arrays:
+        values = getattr(graph, name)
+        if isinstance(values, set):
+            values = sorted(values)
+        sections.append((name, typecode, array(typecode, values).tobytes()))
+    for name in STRINGS:
+        offsets = array(OFFSET_TYPE, [0])
+        chunks = []
+        for value in getattr(graph, name):
+            chunk = value.encode("utf-8")
+            chunks.append(chunk)
+            offsets.append(offsets[-1] + len(chunk))
+        sections.append((f"{name}.offsets", OFFSET_TYPE, offsets.tobytes()))
+        sections.append((f"{name}.data", "B", b"".join(chunks)))
+
+    # Section positions are relative to the end of the header,
+    # so the header can describe them without knowing its own size.
+    layout = {}
+    position = 0
+    for name, typecode, data in sections:
+        layout[name] = [position, len(data), typecode]
+        position = _align(position + len(data))
+
+    header = json.dumps({
+        "version": VERSION,
+        "sources": fingerprint(directory),
+        "people": graph.num_people,
+        "movies": graph.num_movies,
+        "compressed": compressed,
+        "sections": layout,
+    }).encode("utf-8")
+    start = _align(len(MAGIC) + _PREAMBLE.size + len(header))
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(_PREAMBLE.pack(VERSION, len(header)))
+        f.write(header)
+        for name, typecode, data in sections:
+            f.seek(start + layout[name][0])
+            f.write(data)
+    os.replace(temporary, path)
+    if os.path.exists(journal_path(directory)):
+        os.remove(journal_path(directory))
+    return path
+
+
+def append_journal(directory, deltas):
+    """
+    Records applied deltas for the snapshot in `directory`, followed by
+    the current CSV fingerprint, so the CSV files may change alongside.
+    """
+    with open(journal_path(directory), "a", encoding="utf-8") as f:
+        for delta in deltas:
+            f.write(json.dumps(delta) + "\n")
+        f.write(json.dumps({"op": "sources", "sources": fingerprint(directory)}) + "\n")
+
+
+def read_journal(directory):
+    """
+    Returns (deltas, last recorded fingerprint or None) from the journal.
+    """
+    deltas = []
+    sources = None
+    try:
+        with open(journal_path(directory), encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                delta = json.loads(line)
+                if delta["op"] == "sources":
+                    sources = delta["sources"]
+                else:
+                    deltas.append(delta)
+    except FileNotFoundError:
+        pass
+    return deltas, sources
+
+
+def read(directory, check=True):
+    """
+    Maps the snapshot for `directory` and returns a CompactGraph over it.
+    Returns None if there is no snapshot, it has another version,
+    or (with `check`) the CSV files changed since it was written.
+    """
+    mapped = _map(snapshot_path(directory))
+    if mapped is None:
+        return None
+    buffer, header, start = mapped
+    deltas, journal_sources = read_journal(directory)
+    if check and not is_fresh(journal_sources or header["sources"], directory):
+        return None
+
+    view = memoryview(buffer)
+
+    def section(name):
+        offset, size, typecode = header["sections"][name]
+        return view[start + offset:start + offset + size].cast(typecode)
+
+    compressed = header["compressed"]
+    if compressed is not None:
+        graph = CompressedGraph()
+        for name in COMPRESSED:
+            shift, count = compressed[name]
+            setattr(graph, name, CompressedLists(section(f"{name}.blocks"), section(f"{name}.relative"),
+                                                 section(f"{name}.data"), shift, count))
+        arrays = ARRAYS
+    else:
+        graph = CompactGraph()
+        arrays = ADJACENCY + ARRAYS
+    for name, _ in arrays:
+        setattr(graph, name, section(name))
+    for name in STRINGS:
+        setattr(graph, name, StringTable(section(f"{name}.offsets"), section(f"{name}.data")))
+    graph.removed_people = set(graph.removed_people)
+    graph.removed_movies = set(graph.removed_movies)
+
+    # Keep the mapping open for as long as the graph lives
+    graph.snapshot = buffer
+
+    for delta in deltas:
+        graph.apply(delta)
+    return graph
+
+
+def load(directory):
+    """
+    Returns the snapshot graph for `directory`, rebuilding the snapshot
+    from the CSV files if they changed. Returns None if no snapshot
+    was ever built there.
+    """
+    if not os.path.exists(snapshot_path(directory)):
+        return None
+    graph = read(directory)
+    if graph is None:
+        # Rebuild in the same form as before
+        mapped = _map(snapshot_path(directory))
+        compressed = mapped is not None and mapped[1]["compressed"] is not None
+        cls = CompressedGraph if compressed else CompactGraph
+        write(cls.from_csv(directory), directory)
+        graph = read(directory, check=False)
+    return graph
+
+
+def load_or_build(directory):
+    """
+    Returns the snapshot graph for `directory` if one was built there,
+    else a CompactGraph read from the CSV files.
+    """
+    graph = load(directory)
+    if graph is None:
+        graph = CompactGraph.from_csv(directory)
+    return graph
+
+
+def _map(path):
+    """
+    Maps a snapshot file. Returns (mapping, header, start of sections),
+    or None if it is missing or not a snapshot of this version.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    preamble_end = len(MAGIC) + _PREAMBLE.size
+    if buffer[:len(MAGIC)] != MAGIC:
+        return None
+    version, header_size = _PREAMBLE.unpack(buffer[len(MAGIC):preamble_end])
+    if version != VERSION:
+        return None
+    header = json.loads(buffer[preamble_end:preamble_end + header_size])
+    return buffer, header, _align(preamble_end + header_size)
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_deltas(path):
+    """
+    Reads a JSON lines file of CompactGraph.apply deltas.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    args = sys.argv[1:]
+    updates = None
+    compressed = "--compressed" in args
+    if compressed:
+        args.remove("--compressed")
+    for arg in list(args):
+        if arg.startswith("--apply="):
+            updates = arg[len("--apply="):]
+            args.remove(arg)
+    if len(args) > 1:
+        sys.exit("Usage: python snapshot.py [--compressed] [--apply=deltas.jsonl] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
+
+    if updates is not None:
+        # Journal the deltas against the existing snapshot; no rebuild
+        graph = load(directory)
+        if graph is None:
+            sys.exit("No snapshot to update; run python snapshot.py first.")
+        deltas = read_deltas(updates)
+        for delta in deltas:
+            graph.apply(delta)
+        append_journal(directory, deltas)
+        print(f"Applied {len(deltas)} updates to {snapshot_path(directory)}")
+        return
+
+    print("Loading data...")
+    graph = (CompressedGraph if compressed else CompactGraph).from_csv(directory)
+    path = write(graph, directory)
+    print(f"Wrote {graph.num_people} people and {graph.num_movies} movies to {path}")
+    print(f"Adjacency: {graph.adjacency_bytes()} bytes for {graph.num_stars} stars"
+          + (" (compressed)" if compressed else ""))
+    summary = Components(graph).summary()
+    print(f"{summary['components']} components, the largest with {summary['largest']} people, "
+          f"{summary['singletons']} without co-stars")
+
+
+if __name__ == "__main__":
+    main()
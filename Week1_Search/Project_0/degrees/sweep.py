@@ -0,0 +1,186 @@
+import json
+import sys
+from array import array
+from collections import Counter
+
+import search
+import snapshot
+from parallel import pool_context
+
+# Whole-graph distance sweeps from hub people ("Bacon numbers").
+#
+#   python sweep.py [--hubs=ID,ID,...] [--top=N] [--any] [--workers=N]
+#                   [--distances=FILE] [--output=FILE] directory
+#
+# One breadth-first sweep per hub gives its distance to every person;
+# hubs are the given IMDB ids and/or the N people with the most movies.
+# Sweeps run across a process pool, one hub per task. With --any, one
+# extra multi-source sweep gives each person's distance to the nearest
+# hub. The JSON output has a histogram, eccentricity and mean distance
+# per hub, plus diameter bounds for the first hub's component; with
+# --distances, a TSV of every person's distance to each hub (-1 where
+# unreachable) is written too.
+
+# Per-process graph, set by run() in the parent or init_worker() in a worker
+_graph = None
+
+
+def init_worker(directory):
+    global _graph
+    if _graph is None:
+        _graph = snapshot.load_or_build(directory)
+
+
+def summarize(distances):
+    """
+    Returns {"reached", "unreachable", "eccentricity", "mean", "histogram"}
+    for a distance array. The sources themselves count as reached at 0;
+    the mean is over everyone else reached.
+    """
+    counts = Counter(distances)
+    unreachable = counts.pop(-1, 0)
+    reached = sum(counts.values())
+    others = reached - counts.get(0, 0)
+    total = sum(distance * count for distance, count in counts.items())
+    return {
+        "reached": reached,
+        "unreachable": unreachable,
+        "eccentricity": max(counts, default=None),
+        "mean": round(total / others, 4) if others else None,
+        "histogram": {str(distance): counts[distance] for distance in sorted(counts)},
+    }
+
+
+def diameter_bounds(graph, source, source_distances=None):
+    """
+    Bounds on the diameter of `source`'s component from two sweeps: the
+    eccentricity of the person farthest from `source` is a lower bound,
+    twice the eccentricity of `source` an upper bound.
+    """
+    if source_distances is None:
+        source_distances = search.distances_from(graph, source, widen=True)
+    eccentricity = max(source_distances)
+    farthest = source_distances.index(eccentricity)
+    return max(search.distances_from(graph, farthest, widen=True)), 2 * eccentricity
+
+
+def sweep_hub(task):
+    """
+    Pool task: (hub index, keep distances) -> (summary, distance bytes or None).
+    """
+    hub, keep = task
+    hub_distances = search.distances_from(_graph, hub, widen=True)
+    summary = summarize(hub_distances)
+    if not keep:
+        return summary, None
+    return summary, (hub_distances.typecode, hub_distances.tobytes())
+
+
+def run(directory, hub_ids=(), top=0, any_hub=False, workers=None, distances_out=None):
+    """
+    Sweeps from every hub and returns the JSON-ready results; writes the
+    per-person TSV to the open file `distances_out`, if given.
+    """
+    global _graph
+    graph = _graph = snapshot.load_or_build(directory)
+    hubs = []
+    for person_id in hub_ids:
+        person = graph.person_index(person_id)
+        if person is None:
+            raise ValueError(f"unknown person id: {person_id}")
+        hubs.append(person)
+    if top > 0:
+        by_movies = sorted(range(graph.num_people), key=graph.movie_count, reverse=True)
+        hubs += [person for person in by_movies[:top] if person not in hubs]
+    if not hubs:
+        raise ValueError("no hubs given")
+
+    keep = distances_out is not None
+    # The first hub's distances also give the diameter bounds
+    tasks = [(hub, keep or i == 0) for i, hub in enumerate(hubs)]
+    with pool_context().Pool(workers, initializer=init_worker, initargs=(directory,)) as pool:
+        swept = pool.map(sweep_hub, tasks, chunksize=1)
+    columns = [_column(data) for _, data in swept] if keep else []
+
+    results = {"people": graph.num_people, "hubs": []}
+    for hub, (summary, _) in zip(hubs, swept):
+        entry = {"id": graph.person_ids[hub], "name": graph.person_names[hub]}
+        entry.update(summary)
+        results["hubs"].append(entry)
+    first = columns[0] if keep else _column(swept[0][1])
+    lower, upper = diameter_bounds(graph, hubs[0], first)
+    results["diameter"] = {"component_of": graph.person_ids[hubs[0]], "lower": lower, "upper": upper}
+
+    if any_hub:
+        nearest = search.distances_from_any(graph, hubs, widen=True)
+        results["any"] = summarize(nearest)
+        columns.append(nearest)
+
+    if keep:
+        header = [graph.person_ids[hub] for hub in hubs] + (["any"] if any_hub else [])
+        distances_out.write("\t".join(["person_id"] + header) + "\n")
+        for person in range(graph.num_people):
+            if person in graph.removed_people:
+                continue
+            row = [graph.person_ids[person]] + [str(column[person]) for column in columns]
+            distances_out.write("\t".join(row) + "\n")
+    return results
+
+
+def _column(data):
+    typecode, raw = data
+    column = array(typecode)
+    column.frombytes(raw)
+    return column
+
+
+def main():
+    args = sys.argv[1:]
+    hub_ids = []
+    top = 0
+    any_hub = False
+    workers = None
+    distances_path = None
+    output = None
+    for arg in list(args):
+        name, _, value = arg[2:].partition("=")
+        if arg.startswith("--hubs="):
+            hub_ids = [person_id for person_id in value.split(",") if person_id]
+        elif arg.startswith("--top=") and value.isdigit():
+            top = int(value)
+        elif arg == "--any":
+            any_hub = True
+        elif arg.startswith("--workers=") and value.isdigit():
+            workers = int(value)
+        elif arg.startswith("--distances="):
+            distances_path = value
+        elif arg.startswith("--output="):
+            output = value
+        else:
+            continue
+        args.remove(arg)
+    if len(args) != 1 or not (hub_ids or top):
+        sys.exit("Usage: python sweep.py [--hubs=ID,ID,...] [--top=N] [--any] [--workers=N]\n"
+                 "       [--distances=FILE] [--output=FILE] directory\n"
+                 "At least one of --hubs and --top is required.")
+    directory = args[0]
+
+    try:
+        if distances_path is None:
+            results = run(directory, hub_ids, top, any_hub, workers)
+        else:
+            with open(distances_path, "w", encoding="utf-8") as f:
+                results = run(directory, hub_ids, top, any_hub, workers, f)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    text = json.dumps(results, indent=2)
+    if output is None:
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
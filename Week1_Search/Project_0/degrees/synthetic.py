@@ -0,0 +1,85 @@
+import csv
+import os
+import random
+import sys
+
+# Synthetic actor/movie data in the people.csv, movies.csv, stars.csv
+# format of the small/ and large/ directories, for benchmarks.
+#
+# Cast sizes are uniform around `cast`. Who gets cast is skewed: a draw
+# u in [0, 1) picks person int(people * u ** skew), so skew=1 spreads
+# roles evenly and larger values concentrate them on a few prolific
+# "hub" actors, as in the real IMDB data.
+
+FIRST_NAMES = (
+    "Alex", "Ana", "Ben", "Carla", "Dev", "Emma", "Felix", "Grace", "Hugo", "Iris",
+    "Jon", "Kate", "Leo", "Maya", "Nico", "Olga", "Paul", "Rosa", "Sam", "Tara",
+)
+LAST_NAMES = (
+    "Adams", "Bauer", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones",
+    "Khan", "Lopez", "Moreau", "Novak", "Okafor", "Park", "Quinn", "Rossi", "Silva", "Tanaka",
+)
+
+
+def generate(directory, people=10000, movies=5000, cast=4, skew=2.0, islands=0, seed=0):
+    """
+    Writes a random data set to `directory` and returns
+    (people, movies, star rows) counts.
+    `islands` extra two-person movies add small components
+    that are not connected to the rest.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    person_id = lambda i: str(100 + i)
+    movie_id = lambda j: str(1000000 + j)
+    total_people = people + 2 * islands
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(total_people):
+            # Suffixes keep names mostly unique while some still repeat
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i % (total_people // 2 + 1)}"
+            birth = str(rng.randint(1900, 2005)) if rng.random() < 0.9 else ""
+            writer.writerow([person_id(i), name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for j in range(movies + islands):
+            writer.writerow([movie_id(j), f"Movie {j}", str(rng.randint(1920, 2024))])
+
+    rows = 0
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for j in range(movies):
+            stars = {int(people * rng.random() ** skew) for _ in range(rng.randint(1, 2 * cast - 1))}
+            for i in sorted(stars):
+                writer.writerow([person_id(i), movie_id(j)])
+            rows += len(stars)
+        for k in range(islands):
+            for i in (people + 2 * k, people + 2 * k + 1):
+                writer.writerow([person_id(i), movie_id(movies + k)])
+            rows += 2
+
+    return total_people, movies + islands, rows
+
+
+def main():
+    options = {"people": 10000, "movies": 5000, "cast": 4, "skew": 2.0, "islands": 0, "seed": 0}
+    args = sys.argv[1:]
+    for arg in list(args):
+        name, _, value = arg[2:].partition("=")
+        if arg.startswith("--") and name in options:
+            options[name] = type(options[name])(value)
+            args.remove(arg)
+    if len(args) != 1:
+        sys.exit("Usage: python synthetic.py [--people=N] [--movies=N] [--cast=N] "
+                 "[--skew=S] [--islands=N] [--seed=N] directory")
+    counts = generate(args[0], **options)
+    print("Wrote {} people, {} movies and {} stars to {}".format(*counts, args[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 import csv
+import os
 import sys
 import time
 from util_gamma import Node, StackFrontier, QueueFrontier, PriorityQueueFrontier
 
+# Snapshot support lives in the degrees project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "degrees"))
+import snapshot
+from graph import CompactGraph
+from landmarks import LandmarkOracle
+
 ##########################################
 #
 ##########################################
@@ -18,6 +25,13 @@ movies = {}
 
 birth_years = {}
 
+# "birth_year" (original, not admissible) or "landmarks" (ALT: admissible)
+heuristic_mode = "birth_year"
+
+# Compact copy of the data and its landmark distances, for the ALT heuristic
+compact_graph = None
+oracle = None
+
 
 def get_birth_year(person_id):
     return birth_years.get(person_id)
@@ -26,7 +40,21 @@ def get_birth_year(person_id):
 def load_data(directory):
     """
     Load data from CSV files into memory and populate birth_years dictionary.
+    A fresh snapshot built by degrees/snapshot.py is used instead when present.
     """
+    global names, people, movies, birth_years, compact_graph
+    cached = snapshot.load(directory)
+    if cached is not None:
+        compact_graph = cached
+        names = cached.names_view()
+        people = cached.people_view()
+        movies = cached.movies_view()
+        birth_years = {
+            person_id: int(birth) if birth != '' else None
+            for person_id, birth in zip(cached.person_ids, cached.person_births)
+        }
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -72,14 +100,31 @@ def load_data(directory):
                 pass
 
 
+def build_landmarks(k=16):
+    """
+    Precompute landmark distances for the ALT heuristic.
+    """
+    global compact_graph, oracle
+    if compact_graph is None:
+        compact_graph = CompactGraph.from_dicts(people, movies)
+    oracle = LandmarkOracle(compact_graph, k)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    global heuristic_mode
+    args = sys.argv[1:]
+    if "--landmarks" in args:
+        args.remove("--landmarks")
+        heuristic_mode = "landmarks"
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [--landmarks] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
     load_data(directory)
+    if heuristic_mode == "landmarks":
+        build_landmarks()
     print("Data loaded.")
 
     # source = person_id_for_name(input("Name: "))
@@ -106,6 +151,17 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
+def make_heuristic(target):
+    """
+    Returns h(state) for the current heuristic_mode.
+    The landmark heuristic returns None for states that cannot reach target.
+    """
+    if heuristic_mode == "landmarks":
+        target_index = compact_graph.person_index(target)
+        return lambda state: oracle.lower_bound(compact_graph.person_index(state), target_index)
+    return lambda state: heuristic(state, target)
+
+
 def heuristic(state, target):
     # Retrieve the birth years
     birth_year_state = get_birth_year(state)
@@ -136,11 +192,16 @@ def shortest_path(source, target):
     print(f"Starting A* search from {source} to {target}")
     explored_nodes = 0
     start_time = time.time()
+    h = make_heuristic(target)
 
     # Initialize the frontier using the starting node
     start = Node(state=source, parent=None, action=None, cost=0)
     frontier = PriorityQueueFrontier()
-    frontier.add(start, priority=heuristic(start.state, target))
+    start_h = h(start.state)
+    if start_h is None:
+        print("No connection found.")
+        return None
+    frontier.add(start, priority=start_h)
 
     # Initialize an empty explored set
     explored = set()
@@ -171,12 +232,14 @@ def shortest_path(source, target):
 
         # Add neighbors to the frontier
         for action, state in neighbors_for_person(node.state):
-            if state not in explored and not frontier.contains_state(state):
-                child = Node(state=state, parent=node, action=action, cost=node.cost + 1)
-                priority = child.cost + heuristic(child.state, target)
-                frontier.add(child, priority)
-            # Optionally, update the node in frontier if a better path is found
-            # Implement this if necessary
+            if state in explored:
+                continue
+            child_h = h(state)
+            if child_h is None:
+                continue
+            child = Node(state=state, parent=node, action=action, cost=node.cost + 1)
+            # Re-adding a queued state keeps whichever path is cheaper
+            frontier.add(child, child.cost + child_h)
 
     # If no path found
     print("No connection found.")
@@ -1,9 +1,14 @@
 import csv
+import os
 import sys
 import time
 
 from util import Node, StackFrontier, QueueFrontier
 
+# Snapshot support lives in the degrees project
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "degrees"))
+import snapshot
+
 # Maps names to a set of corresponding person_ids
 names = {}
 
@@ -17,7 +22,16 @@ movies = {}
 def load_data(directory):
     """
     Load data from CSV files into memory.
+    A fresh snapshot built by degrees/snapshot.py is used instead when present.
     """
+    global names, people, movies
+    cached = snapshot.load(directory)
+    if cached is not None:
+        names = cached.names_view()
+        people = cached.people_view()
+        movies = cached.movies_view()
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
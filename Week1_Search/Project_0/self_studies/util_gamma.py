@@ -1,7 +1,9 @@
-import heapq
+from collections import deque
 
 
 class Node():
+    __slots__ = ("state", "parent", "action", "cost")
+
     def __init__(self, state, parent, action, cost):
         self.state = state
         self.parent = parent
@@ -12,12 +14,15 @@ class Node():
 class StackFrontier():
     def __init__(self):
         self.frontier = []
+        # state -> number of queued nodes with that state
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -26,35 +31,76 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self._forget(node)
             return node
 
+    def _forget(self, node):
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+
 
 class QueueFrontier(StackFrontier):
+    def __init__(self):
+        super().__init__()
+        self.frontier = deque()
 
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self._forget(node)
             return node
 
 
 
 class PriorityQueueFrontier:
+    """
+    Indexed binary heap keyed by node.state: contains_state is a dict
+    lookup and a queued node can have its priority lowered in place.
+    Nodes with equal priority come out in insertion order.
+    """
+
     def __init__(self):
+        # Heap of [priority, entry_count, node] entries
         self.frontier = []
+        # state -> position of its entry in self.frontier
+        self.positions = {}
         self.entry_count = 0  # To handle nodes with equal priority
 
     def add(self, node, priority):
-        # Use a tuple of (priority, entry_count, node) to ensure FIFO order for equal priorities
-        heapq.heappush(self.frontier, (priority, self.entry_count, node))
+        # A state is queued at most once; re-adding it is a decrease-key
+        if node.state in self.positions:
+            self.decrease_key(node, priority)
+            return
+        self.frontier.append([priority, self.entry_count, node])
         self.entry_count += 1
+        self.positions[node.state] = len(self.frontier) - 1
+        self._sift_up(len(self.frontier) - 1)
+
+    def decrease_key(self, node, priority):
+        """
+        Replaces the queued node for node.state if `priority` is lower.
+        Returns True if the frontier changed.
+        """
+        index = self.positions[node.state]
+        entry = self.frontier[index]
+        if priority >= entry[0]:
+            return False
+        entry[0] = priority
+        entry[2] = node
+        self._sift_up(index)
+        return True
+
+    def priority(self, state):
+        return self.frontier[self.positions[state]][0]
 
     def contains_state(self, state):
-        return any(node.state == state for _, _, node in self.frontier)
+        return state in self.positions
 
     def empty(self):
         return len(self.frontier) == 0
@@ -62,5 +108,42 @@ class PriorityQueueFrontier:
     def remove(self):
         if self.empty():
             raise Exception("Frontier is empty")
-        _, _, node = heapq.heappop(self.frontier)
-        return node
+        last = self.frontier.pop()
+        if self.frontier:
+            entry = self.frontier[0]
+            self._place(last, 0)
+            self._sift_down(0)
+        else:
+            entry = last
+        del self.positions[entry[2].state]
+        return entry[2]
+
+    def _place(self, entry, index):
+        self.frontier[index] = entry
+        self.positions[entry[2].state] = index
+
+    def _sift_up(self, index):
+        # Entries compare by (priority, entry_count); counts are unique
+        entry = self.frontier[index]
+        while index > 0:
+            parent = (index - 1) // 2
+            if not entry < self.frontier[parent]:
+                break
+            self._place(self.frontier[parent], index)
+            index = parent
+        self._place(entry, index)
+
+    def _sift_down(self, index):
+        entry = self.frontier[index]
+        size = len(self.frontier)
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and self.frontier[child + 1] < self.frontier[child]:
+                child += 1
+            if not self.frontier[child] < entry:
+                break
+            self._place(self.frontier[child], index)
+            index = child
+        self._place(entry, index)